@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────
+#   Буфер активности пользователей (write-behind)
+# ────────────────────────────────────────────────────────────
+#   Каждый визит пишется в память; повторные визиты одного
+#   пользователя схлопываются в одну запись с последним last_seen.
+#   В Postgres буфер уходит одним INSERT … ON CONFLICT DO UPDATE
+#   раз в flush_interval секунд, при переполнении и при остановке.
+#
+#   Тем же запросом ведутся сводки для статистики. activity_daily_stats —
+#   строка на день: активные, новые и gaps — гистограмма «сколько дней
+#   прошло с прошлого визита» (gaps[g], g = 1…31, 31 — месяц и больше
+#   или новый). Уникальные пользователи за окно из L ≤ 31 дней — это
+#   визиты дня D окна, у которых прошлый визит был до начала окна,
+#   т.е. сумма gaps[g] с g > D − начало окна: O(дней), а не O(пользователей).
+#   user_activity_daily нужна только чтобы засчитать первый визит за
+#   день, поэтому хранится keep_days дней.
+
+FLUSH_SQL = """
+    WITH batch AS (
+        SELECT * FROM unnest(CAST(:ids AS BIGINT[]), CAST(:seen AS TIMESTAMP[])) AS u(user_id, seen)
+    ), prev AS (                                  -- снимок до обновления: прошлый визит
+        SELECT u.user_id, CAST(u.last_seen AS DATE) AS day FROM users u JOIN batch b USING (user_id)
+    ), upserted AS (
+        INSERT INTO users (user_id, first_seen, last_seen)
+        SELECT user_id, seen, seen FROM batch
+        ON CONFLICT (user_id) DO UPDATE
+           SET last_seen = GREATEST(users.last_seen, EXCLUDED.last_seen)
+        RETURNING first_seen, (xmax = 0) AS inserted
+    ), visits AS (
+        INSERT INTO user_activity_daily (day, user_id)
+        SELECT CAST(seen AS DATE), user_id FROM batch
+        ON CONFLICT DO NOTHING
+        RETURNING day, user_id
+    ), gaps AS (
+        SELECT v.day, GREATEST(LEAST(COALESCE(v.day - p.day, 31), 31), 1) AS gap, COUNT(*) AS n
+        FROM visits v LEFT JOIN prev p USING (user_id)
+        GROUP BY 1, 2
+    ), counts AS (
+        SELECT day, COUNT(*) AS active, 0 AS new_users FROM visits GROUP BY day
+        UNION ALL
+        SELECT CAST(first_seen AS DATE), 0, COUNT(*) FROM upserted WHERE inserted GROUP BY 1
+    )
+    INSERT INTO activity_daily_stats (day, active, new_users, gaps)
+    SELECT c.day, SUM(c.active), SUM(c.new_users),
+           ARRAY(SELECT COALESCE(SUM(g.n), 0) FROM generate_series(1, 31) i
+                 LEFT JOIN gaps g ON g.day = c.day AND g.gap = i GROUP BY i ORDER BY i)
+    FROM counts c GROUP BY c.day
+    ON CONFLICT (day) DO UPDATE
+       SET active    = activity_daily_stats.active    + EXCLUDED.active,
+           new_users = activity_daily_stats.new_users + EXCLUDED.new_users,
+           gaps      = ARRAY(SELECT COALESCE(a, 0) + COALESCE(b, 0)
+                             FROM unnest(activity_daily_stats.gaps, EXCLUDED.gaps) AS t(a, b))
+"""
+
+ACTIVE_SQL = """
+    SELECT COALESCE(SUM(g.n), 0)
+    FROM activity_daily_stats s
+    CROSS JOIN LATERAL unnest(s.gaps) WITH ORDINALITY AS g(n, gap)
+    WHERE s.day >= CAST(:since AS DATE)
+      AND g.gap > s.day - CAST(:since AS DATE)
+"""
+
+
+class ActivityBuffer:
+    def __init__(self, database: Database,
+                 flush_interval: float = 5.0, max_size: int = 1000, keep_days: int = 7):
+        self.database       = database
+        self.flush_interval = flush_interval
+        self.max_size       = max_size
+        self.keep_days      = keep_days
+        self._pruned: date | None = None
+        self._pending:  dict[int, datetime] = {}
+        self._inflight: dict[int, datetime] = {}
+        self._lock  = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._overflow_task: asyncio.Task | None = None
+
+    def touch(self, user_id: int) -> None:
+        self._pending[user_id] = datetime.utcnow()
+        if len(self._pending) >= self.max_size and not self._flush_scheduled():
+            self._overflow_task = asyncio.create_task(self._safe_flush())
+
+    def snapshot(self) -> dict[int, datetime]:
+        """Ещё не записанные в БД визиты (включая те, что пишутся прямо сейчас)."""
+        return {**self._inflight, **self._pending}
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending:
+                return 0
+            self._inflight, self._pending = self._pending, {}
+            try:
+                await self.database.execute(FLUSH_SQL, values={
+                    "ids":  list(self._inflight.keys()),
+                    "seen": list(self._inflight.values()),
+                })
+            except Exception:
+                # возвращаем записи в буфер, более свежие визиты важнее
+                self._pending = {**self._inflight, **self._pending}
+                raise
+            finally:
+                flushed, self._inflight = len(self._inflight), {}
+            return flushed
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._safe_flush()                  # ошибка не должна сорвать остальную остановку бота
+
+    # ── статистика; несброшенные визиты учитываются наравне с записанными ──
+
+    async def active_users(self, days: int = 1) -> int:
+        """Уникальные пользователи за последние days (≤ 31) дней, включая сегодня."""
+        await self.flush()                        # буфер сначала в сводку — тогда хватает суточных строк
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        return await self.database.fetch_val(ACTIVE_SQL, values={"since": since}) or 0
+
+    async def new_users_today(self) -> int:
+        today  = datetime.utcnow().date()
+        stored = await self.database.fetch_val(
+            "SELECT new_users FROM activity_daily_stats WHERE day = :d", values={"d": today}
+        ) or 0
+        unseen = await self.database.fetch_val("""
+            SELECT COUNT(*) FROM unnest(CAST(:ids AS BIGINT[])) AS u(user_id)
+            WHERE NOT EXISTS (SELECT 1 FROM users WHERE users.user_id = u.user_id)
+        """, values={"ids": [uid for uid, seen in self.snapshot().items() if seen.date() == today]}) or 0
+        return stored + unseen
+
+    async def daily_series(self, days: int = 7) -> list:
+        """Активные и новые пользователи по дням (без несброшенного буфера)."""
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        return await self.database.fetch_all(
+            "SELECT day, active, new_users FROM activity_daily_stats WHERE day >= :since ORDER BY day",
+            values={"since": since}
+        )
+
+    async def _safe_flush(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Не удалось сбросить буфер активности")
+
+    def _flush_scheduled(self) -> bool:
+        return self._overflow_task is not None and not self._overflow_task.done()
+
+    async def prune(self) -> None:
+        """Раз в сутки удаляет визиты старше keep_days: для сводок они уже не нужны."""
+        today = datetime.utcnow().date()
+        if self._pruned == today:
+            return
+        await self.database.execute(
+            "DELETE FROM user_activity_daily WHERE day < :d",
+            values={"d": today - timedelta(days=self.keep_days)}
+        )
+        self._pruned = today
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                await self.prune()
+            except Exception:
+                logger.exception("Не удалось сбросить буфер активности")
@@ -0,0 +1,133 @@
+"""
+Старый стек (databases + SQLAlchemy) против собственного пула asyncpg.
+
+Меряется холодный старт (импорт в отдельном процессе и создание пула)
+и задержка горячих запросов бота. Таблицы создаются в отдельной схеме
+bench_db. Если databases не установлен, меряется только новый стек.
+
+    DATABASE_URL=postgresql://... python bench/bench_db_stack.py
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from database import Database  # noqa: E402
+
+try:
+    import databases
+except ImportError:
+    databases = None
+
+SCHEMA     = "bench_db"
+CATEGORIES = ['football', 'hockey', 'dota', 'cs', 'tennis']
+
+QUERIES = {
+    "каталог прогнозов": (
+        "SELECT id, sport FROM forecasts ORDER BY id", lambda i: None),
+    "выдачи пользователя": (
+        "SELECT forecast_id FROM deliveries WHERE user_id = :u", lambda i: {"u": i % 1000}),
+    "выдача прогноза": (
+        "INSERT INTO deliveries (user_id, forecast_id) VALUES (:u, :f) "
+        "ON CONFLICT (user_id, forecast_id) DO NOTHING",
+        lambda i: {"u": 1000 + i, "f": 1 + i % 100}),
+    "счётчик": (
+        "SELECT COUNT(*) FROM deliveries WHERE forecast_id = :f", lambda i: {"f": 1 + i % 100}),
+}
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings.sort()
+    print(f"{name:<40} mean {statistics.mean(timings) * 1e3:8.3f} ms   "
+          f"p50 {timings[len(timings) // 2] * 1e3:8.3f} ms   "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e3:8.3f} ms")
+
+
+def import_time(module: str, runs: int) -> list[float]:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    return [float(subprocess.check_output([sys.executable, "-c", code], cwd=ROOT)) for _ in range(runs)]
+
+
+async def populate(db) -> None:
+    await db.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await db.execute(f"CREATE SCHEMA {SCHEMA}")
+    await db.execute(f"""
+        CREATE TABLE {SCHEMA}.forecasts (
+            id    SERIAL PRIMARY KEY,
+            sport VARCHAR(50) NOT NULL
+        )
+    """)
+    await db.execute(f"""
+        CREATE TABLE {SCHEMA}.deliveries (
+            id          SERIAL PRIMARY KEY,
+            user_id     BIGINT NOT NULL,
+            forecast_id INT NOT NULL REFERENCES {SCHEMA}.forecasts(id) ON DELETE CASCADE,
+            UNIQUE(user_id, forecast_id)
+        )
+    """)
+    await db.execute(
+        f"INSERT INTO {SCHEMA}.forecasts (sport) "
+        "SELECT (CAST(:cats AS TEXT[]))[1 + g % 5] FROM generate_series(1, 100) g",
+        values={"cats": CATEGORIES}
+    )
+    await db.execute(
+        f"INSERT INTO {SCHEMA}.deliveries (user_id, forecast_id) "
+        "SELECT u, f FROM generate_series(1, 1000) u, generate_series(1, 100) f WHERE random() < 0.3"
+    )
+    await db.execute(f"ANALYZE {SCHEMA}.forecasts")
+    await db.execute(f"ANALYZE {SCHEMA}.deliveries")
+
+
+async def run(name: str, make_db, samples: int) -> None:
+    t0 = time.perf_counter()
+    db = make_db()
+    await db.connect()
+    await db.fetch_val("SELECT 1")
+    report(f"{name}: подключение", [time.perf_counter() - t0])
+    try:
+        for label, (query, values) in QUERIES.items():
+            timings = []
+            for i in range(samples):
+                t0 = time.perf_counter()
+                if query.startswith("INSERT"):
+                    await db.execute(query, values=values(i))
+                else:
+                    await db.fetch_all(query, values=values(i))
+                timings.append(time.perf_counter() - t0)
+            report(f"{name}: {label}", timings)
+        await db.execute("DELETE FROM deliveries WHERE user_id > 1000")
+    finally:
+        await db.disconnect()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=2_000)
+    parser.add_argument("--imports", type=int, default=5, help="запусков для замера импорта")
+    args = parser.parse_args()
+    url = os.environ["DATABASE_URL"]
+
+    report("импорт database (asyncpg)", import_time("database", args.imports))
+    if databases is not None:
+        report("импорт databases + SQLAlchemy", import_time("databases", args.imports))
+
+    db = Database(url)
+    await db.connect()
+    try:
+        await populate(db)
+    finally:
+        await db.disconnect()
+
+    settings = {"search_path": SCHEMA}
+    await run("asyncpg", lambda: Database(url, server_settings=settings), args.samples)
+    if databases is not None:
+        await run("databases", lambda: databases.Database(url, server_settings=settings), args.samples)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Сравнение LEFT JOIN из старого get_available_forecasts с ForecastIndex.
+
+Данные (10k пользователей × 500 прогнозов, часть уже выдана) создаются
+в отдельной схеме bench_index, рабочие таблицы не затрагиваются.
+
+    DATABASE_URL=postgresql://... python bench/bench_forecast_index.py
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import Database  # noqa: E402
+from forecast_index import ForecastIndex  # noqa: E402
+
+CATEGORIES = ['football', 'hockey', 'dota', 'cs', 'tennis']
+SCHEMA     = "bench_index"
+
+LEFT_JOIN_SQL = """
+    SELECT f.id, f.sport
+    FROM forecasts f
+    LEFT JOIN deliveries d
+      ON d.forecast_id = f.id AND d.user_id = :uid
+    WHERE d.forecast_id IS NULL
+"""
+
+
+async def populate(db: Database, users: int, forecasts: int, ratio: float) -> None:
+    await db.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await db.execute(f"CREATE SCHEMA {SCHEMA}")
+    await db.execute("""
+        CREATE TABLE forecasts (
+            id           SERIAL PRIMARY KEY,
+            sport        VARCHAR(50) NOT NULL,
+            publish_date DATE NOT NULL DEFAULT CURRENT_DATE
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE deliveries (
+            id          SERIAL PRIMARY KEY,
+            user_id     BIGINT NOT NULL,
+            forecast_id INT NOT NULL REFERENCES forecasts(id) ON DELETE CASCADE,
+            publish_date DATE NOT NULL DEFAULT CURRENT_DATE,
+            UNIQUE(user_id, forecast_id)
+        )
+    """)
+    await db.execute(
+        "INSERT INTO forecasts (sport) "
+        "SELECT (CAST(:cats AS TEXT[]))[1 + g % 5] FROM generate_series(1, CAST(:n AS INT)) g",
+        values={"cats": CATEGORIES, "n": forecasts}
+    )
+    await db.execute(
+        "INSERT INTO deliveries (user_id, forecast_id) "
+        "SELECT u, f FROM generate_series(1, CAST(:u AS INT)) u, generate_series(1, CAST(:f AS INT)) f "
+        "WHERE random() < :r",
+        values={"u": users, "f": forecasts, "r": ratio}
+    )
+    await db.execute("ANALYZE")
+
+
+async def measure(name: str, fn, user_ids: list[int]) -> None:
+    timings = []
+    for uid in user_ids:
+        t0 = time.perf_counter()
+        await fn(uid)
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    print(f"{name:<22} mean {statistics.mean(timings):7.3f} ms   "
+          f"p50 {timings[len(timings) // 2]:7.3f} ms   "
+          f"p99 {timings[int(len(timings) * 0.99)]:7.3f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users",     type=int,   default=10_000)
+    parser.add_argument("--forecasts", type=int,   default=500)
+    parser.add_argument("--delivered", type=float, default=0.3, help="доля уже выданных прогнозов")
+    parser.add_argument("--samples",   type=int,   default=2_000)
+    parser.add_argument("--skip-populate", action="store_true")
+    args = parser.parse_args()
+
+    db = Database(os.environ["DATABASE_URL"], server_settings={"search_path": SCHEMA})
+    await db.connect()
+    try:
+        if not args.skip_populate:
+            t0 = time.perf_counter()
+            await populate(db, args.users, args.forecasts, args.delivered)
+            print(f"данные подготовлены за {time.perf_counter() - t0:.1f} с")
+
+        sample = [random.randint(1, args.users) for _ in range(args.samples)]
+        index  = ForecastIndex(db, CATEGORIES, capacity=args.users)
+
+        await measure("LEFT JOIN", lambda uid: db.fetch_all(LEFT_JOIN_SQL, values={"uid": uid}), sample)
+        await measure("index, холодный", index.available, sample)
+        await measure("index, горячий", index.available, sample)
+        await measure("index counts, горячий", index.counts, sample)
+        print(f"попаданий {index.hits}, промахов {index.misses}")
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""
+Задержка get_data / update_data: MemoryStorage против PostgresStorage.
+
+PostgresStorage меряется дважды: с локальным кэшем (по умолчанию) и без
+него (cache_ttl=0), когда каждое чтение идёт в Postgres. Чтения идут
+отдельным проходом после сброса буфера записей. Таблица fsm_storage
+(та же, что в миграции 1) создаётся в отдельной схеме bench_fsm.
+
+    DATABASE_URL=postgresql://... python bench/bench_fsm_storage.py
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import Database  # noqa: E402
+from fsm_storage import PostgresStorage  # noqa: E402
+
+SCHEMA = "bench_fsm"
+DATA   = {"intro_done": True,
+          "user_forecasts": {s: list(range(20)) for s in ['football', 'hockey', 'dota', 'cs', 'tennis']}}
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings.sort()
+    print(f"{name:<34} mean {statistics.mean(timings) * 1e6:9.1f} µs   "
+          f"p50 {timings[len(timings) // 2] * 1e6:9.1f} µs   "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:9.1f} µs")
+
+
+async def run(name: str, storage, users: int, rounds: int) -> None:
+    keys = [StorageKey(bot_id=1, chat_id=uid, user_id=uid) for uid in range(1, users + 1)]
+    get_t, upd_t = [], []
+    for _ in range(rounds):
+        for key in keys:
+            t0 = time.perf_counter()
+            await storage.update_data(key, DATA)
+            upd_t.append(time.perf_counter() - t0)
+        # записи копятся в буфере PostgresStorage: без сброса get_data отдавал бы
+        # только что записанное из памяти и не доходил бы до Postgres
+        if hasattr(storage, "flush"):
+            await storage.flush()
+        for key in keys:
+            t0 = time.perf_counter()
+            await storage.get_data(key)
+            get_t.append(time.perf_counter() - t0)
+    report(f"{name}: update_data", upd_t)
+    report(f"{name}: get_data", get_t)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users",  type=int, default=1_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    db = Database(os.environ["DATABASE_URL"], server_settings={"search_path": SCHEMA})
+    await db.connect()
+    try:
+        await db.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await db.execute(f"CREATE SCHEMA {SCHEMA}")
+        await db.execute(f"""
+            CREATE TABLE {SCHEMA}.fsm_storage (
+                key        TEXT PRIMARY KEY,
+                state      TEXT,
+                data       JSONB NOT NULL DEFAULT '{{}}',
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        await run("MemoryStorage", MemoryStorage(), args.users, args.rounds)
+        for name, ttl in (("PostgresStorage", 2.0), ("PostgresStorage без кэша", 0.0)):
+            storage = PostgresStorage(db, cache_ttl=ttl)
+            await storage.start()
+            await run(name, storage, args.users, args.rounds)
+            await storage.close()
+            await db.execute("TRUNCATE fsm_storage")
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
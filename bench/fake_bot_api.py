@@ -0,0 +1,121 @@
+"""
+Заглушка Telegram Bot API для нагрузочных тестов.
+
+Отвечает на методы, которые вызывает бот, правдоподобными объектами,
+может добавлять искусственную задержку и считает вызовы по методам.
+Запускается из loadtest.py или отдельно:
+
+    python bench/fake_bot_api.py --port 8081 --latency 30
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+# минимальный валидный JPEG 1×1
+TINY_JPEG = bytes.fromhex(
+    "ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c140d0c0b0b0c1912"
+    "130f141d1a1f1e1d1a1c1c20242e2720222c231c1c2837292c30313434341f27393d38323c2e333432ffc0000b080001"
+    "000101011100ffc4001f0000010501010101010100000000000000000102030405060708090a0bffc400b5100002010303"
+    "020403050504040000017d01020300041105122131410613516107227114328191a1082342b1c11552d1f02433627282"
+    "090a161718191a25262728292a3435363738393a434445464748494a535455565758595a636465666768696a73747576"
+    "7778797a838485868788898a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4c5c6c7c8c9ca"
+    "d2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1f2f3f4f5f6f7f8f9faffda0008010100003f00fbd3ffd9"
+)
+
+
+class FakeBotAPI:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms  = jitter_ms
+        self.calls: Counter[str] = Counter()
+        self.webhook_url = ""
+        self._ids = itertools.count(1)
+        self.app = web.Application()
+        self.app.add_routes([
+            web.post("/bot{token}/{method}", self.on_method),
+            web.get("/file/bot{token}/{path:.*}", self.on_file),
+        ])
+
+    async def on_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params = dict(await request.post()) if request.can_read_body else {}
+        await self._delay()
+        handler = getattr(self, f"_{method}", None)
+        result  = handler(params) if handler else True
+        return web.json_response({"ok": True, "result": result})
+
+    async def on_file(self, request: web.Request) -> web.Response:
+        self.calls["download"] += 1
+        await self._delay()
+        return web.Response(body=TINY_JPEG, content_type="image/jpeg")
+
+    async def _delay(self) -> None:
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+    def _message(self, params: dict, **extra) -> dict:
+        chat_id = int(params.get("chat_id", 0) or 0)
+        return {
+            "message_id": next(self._ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            **extra,
+        }
+
+    def _sendMessage(self, params):
+        return self._message(params, text=params.get("text", ""))
+
+    def _sendVideo(self, params):
+        return self._message(params, caption=params.get("caption"))
+
+    def _sendPhoto(self, params):
+        n = next(self._ids)
+        return self._message(params, caption=params.get("caption"), photo=[
+            {"file_id": f"fake-photo-{n}", "file_unique_id": f"u{n}", "width": 1, "height": 1}
+        ])
+
+    def _editMessageReplyMarkup(self, params):
+        return self._message(params)
+
+    def _getFile(self, params):
+        return {"file_id": params.get("file_id"), "file_unique_id": "u", "file_path": "photos/fake.jpg"}
+
+    def _getMe(self, params):
+        return {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+
+    def _setWebhook(self, params):
+        self.webhook_url = params.get("url", "")
+        return True
+
+    def _getWebhookInfo(self, params):
+        return {"url": self.webhook_url, "has_custom_certificate": False, "pending_update_count": 0}
+
+
+async def start(port: int, latency_ms: float = 0.0, jitter_ms: float = 0.0) -> tuple[FakeBotAPI, web.AppRunner]:
+    api    = FakeBotAPI(latency_ms, jitter_ms)
+    runner = web.AppRunner(api.app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return api, runner
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port",    type=int,   default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, мс")
+    parser.add_argument("--jitter",  type=float, default=0.0, help="случайная добавка к задержке, мс")
+    args = parser.parse_args()
+    await start(args.port, args.latency, args.jitter)
+    print(f"Fake Bot API на http://127.0.0.1:{args.port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
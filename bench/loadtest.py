@@ -0,0 +1,286 @@
+"""
+Нагрузочный тест бота: синтетические апдейты через on_webhook.
+
+Поднимает aiohttp-приложение из main.py на локальном порту, подменяет
+Telegram заглушкой (fake_bot_api.py) и шлёт на WEBHOOK_PATH смесь
+апдейтов: /start, «🔮 AI прогнозы», buy_* и произвольный текст.
+По каждому типу считает пропускную способность, p50/p95/p99 времени
+обработки и число SQL-запросов на апдейт; результат пишется в JSON,
+с которым можно сравнить следующий прогон.
+
+ВНИМАНИЕ: при старте main.py применяет миграции, а тест пишет в базу
+пользователей, выдачи и активность — DATABASE_URL должен указывать
+на отдельную тестовую базу.
+
+Флуд-контроль по умолчанию отключён (THROTTLE_* очень большие): иначе
+синтетические пользователи упираются в лимиты, а отброшенные апдейты
+не доходят до обработки. Если лимиты заданы явно, отброшенные вычитаются
+из ожидаемых и попадают в отчёт (throttled).
+
+    DATABASE_URL=postgresql://localhost/bot_bench \\
+    python bench/loadtest.py --updates 5000 --concurrency 50 --out run.json
+    python bench/loadtest.py --compare run.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+import aiohttp
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+API_PORT = int(os.getenv("FAKE_API_PORT", "8081"))
+BOT_PORT = int(os.getenv("LOADTEST_PORT", "8090"))
+os.environ.setdefault("TELEGRAM_API_URL", f"http://127.0.0.1:{API_PORT}")
+os.environ.setdefault("WEBHOOK_HOST", f"http://127.0.0.1:{BOT_PORT}")
+for _name in ("THROTTLE_MESSAGES", "THROTTLE_CALLBACKS", "THROTTLE_BUYS"):
+    os.environ.setdefault(_name, "1000000000")
+
+import fake_bot_api  # noqa: E402
+import main          # noqa: E402
+
+DEFAULT_MIX = "start=1,menu=3,buy=4,text=2"
+update_type = contextvars.ContextVar("update_type", default=None)
+query_count = contextvars.ContextVar("query_count", default=None)
+
+
+# ────────────────────────────────────────────────────────────
+#   Синтетические апдейты
+# ────────────────────────────────────────────────────────────
+_ids = itertools.count(1)
+
+
+def _user(uid: int) -> dict:
+    return {"id": uid, "is_bot": False, "first_name": f"user{uid}"}
+
+
+def _message(uid: int, text: str) -> dict:
+    entities = [{"type": "bot_command", "offset": 0, "length": len(text)}] if text.startswith("/") else None
+    msg = {"message_id": next(_ids), "date": int(time.time()),
+           "chat": {"id": uid, "type": "private"}, "from": _user(uid), "text": text}
+    if entities:
+        msg["entities"] = entities
+    return {"update_id": next(_ids), "message": msg}
+
+
+def _callback(uid: int, data: str) -> dict:
+    return {"update_id": next(_ids), "callback_query": {
+        "id": str(next(_ids)), "from": _user(uid), "chat_instance": str(uid), "data": data,
+        "message": {"message_id": next(_ids), "date": int(time.time()),
+                    "chat": {"id": uid, "type": "private"}, "text": "menu"},
+    }}
+
+
+BUILDERS = {
+    "start": lambda uid: _message(uid, "/start"),
+    "menu":  lambda uid: _message(uid, "🔮 AI прогнозы"),
+    "buy":   lambda uid: _callback(uid, f"buy_{random.choice(main.CATEGORIES)}"),
+    "text":  lambda uid: _message(uid, random.choice(["привет", "когда прогноз?", "ок", "👍"])),
+}
+
+
+def parse_mix(spec: str) -> list[tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in BUILDERS:
+            raise SystemExit(f"неизвестный тип апдейта: {name}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+# ────────────────────────────────────────────────────────────
+#   Инструментирование: время обработки и SQL-запросы на апдейт
+# ────────────────────────────────────────────────────────────
+class Recorder:
+    def __init__(self):
+        self.latency: dict[str, list[float]] = defaultdict(list)
+        self.queries: dict[str, list[int]]   = defaultdict(list)
+        self.ingest:  list[float] = []
+        self.rejected = 0
+        self.throttled = 0
+        self.sent_at: dict[int, tuple[str, float]] = {}
+        self.done = asyncio.Event()
+        self.expected = 0
+        self.finished = 0
+
+    def install(self) -> None:
+        feed = main.dp.feed_update
+
+        async def timed_feed_update(bot, update, **kwargs):
+            kind, sent = self.sent_at.pop(update.update_id, ("unknown", time.perf_counter()))
+            counter = [0]
+            update_type.set(kind)
+            query_count.set(counter)
+            try:
+                return await feed(bot, update, **kwargs)
+            finally:
+                self.latency[kind].append(time.perf_counter() - sent)
+                self.queries[kind].append(counter[0])
+                self.finished += 1
+                if self.finished >= self.expected:
+                    self.done.set()
+
+        main.dp.feed_update = timed_feed_update
+
+        for name in ("execute", "execute_many", "fetch_all", "fetch_one", "fetch_val"):
+            original = getattr(main.database, name)
+
+            def counted(*args, __original=original, **kwargs):
+                counter = query_count.get()
+                if counter is not None:
+                    counter[0] += 1
+                return __original(*args, **kwargs)
+
+            setattr(main.database, name, counted)
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def summarize(rec: Recorder, elapsed: float, api: fake_bot_api.FakeBotAPI, args) -> dict:
+    by_type = {}
+    for kind, lat in sorted(rec.latency.items()):
+        by_type[kind] = {
+            "count":          len(lat),
+            "throughput":     round(len(lat) / elapsed, 2),
+            "p50_ms":         round(percentile(lat, 0.50) * 1000, 2),
+            "p95_ms":         round(percentile(lat, 0.95) * 1000, 2),
+            "p99_ms":         round(percentile(lat, 0.99) * 1000, 2),
+            "db_queries_avg": round(statistics.mean(rec.queries[kind]), 2),
+        }
+    total = sum(len(v) for v in rec.latency.values())
+    return {
+        "params": {"updates": args.updates, "concurrency": args.concurrency, "users": args.users,
+                   "mix": args.mix, "api_latency_ms": args.api_latency},
+        "elapsed_s":   round(elapsed, 3),
+        "throughput":  round(total / elapsed, 2),
+        "rejected":    rec.rejected,
+        "throttled":   rec.throttled,
+        "ingest_p50_ms": round(percentile(rec.ingest, 0.50) * 1000, 2),
+        "ingest_p99_ms": round(percentile(rec.ingest, 0.99) * 1000, 2),
+        "api_calls":   dict(api.calls),
+        "by_type":     by_type,
+    }
+
+
+# ────────────────────────────────────────────────────────────
+#   Прогон
+# ────────────────────────────────────────────────────────────
+async def seed_forecasts(per_sport: int) -> None:
+    items = []
+    for sport in main.CATEGORIES:
+        for i in range(per_sport):
+            blob = await main.blobs.save_bytes(fake_bot_api.TINY_JPEG + f"{sport}{i}".encode(), sport)
+            items.append((sport, blob, f"fake-photo-{sport}-{i}"))
+    await main.save_forecasts_bulk(items)
+
+
+async def fire(session: aiohttp.ClientSession, rec: Recorder, url: str, kind: str, uid: int) -> None:
+    update = BUILDERS[kind](uid)
+    rec.sent_at[update["update_id"]] = (kind, time.perf_counter())
+    t0 = time.perf_counter()
+    async with session.post(url, json=update) as resp:
+        rec.ingest.append(time.perf_counter() - t0)
+        if resp.status != 200:
+            rec.rejected += 1
+            rec.sent_at.pop(update["update_id"], None)
+            rec.expected -= 1
+
+
+async def run(args) -> dict:
+    api, api_runner = await fake_bot_api.start(API_PORT, args.api_latency, args.api_jitter)
+    bot_runner = web.AppRunner(main.app, access_log=None)
+    await bot_runner.setup()
+    await web.TCPSite(bot_runner, "127.0.0.1", BOT_PORT).start()
+
+    try:
+        await seed_forecasts(args.forecasts)
+        rec = Recorder()
+        rec.install()
+        url   = f"http://127.0.0.1:{BOT_PORT}{main.WEBHOOK_PATH}"
+        mix   = parse_mix(args.mix)
+        kinds = random.choices([k for k, _ in mix], weights=[w for _, w in mix], k=args.updates)
+        users = list(range(1_000_000, 1_000_000 + args.users))
+        rec.expected = len(kinds)
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        async with aiohttp.ClientSession() as session:
+            async def limited(kind):
+                async with semaphore:
+                    await fire(session, rec, url, kind, random.choice(users))
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*(limited(k) for k in kinds))
+            # отброшенные флуд-контролем получили 200, но до feed_update не дойдут
+            rec.throttled = sum(main.throttle.dropped.values())
+            rec.expected -= rec.throttled
+            if rec.finished < rec.expected:
+                await asyncio.wait_for(rec.done.wait(), timeout=args.timeout)
+            elapsed = time.perf_counter() - t0
+        return summarize(rec, elapsed, api, args)
+    finally:
+        await bot_runner.cleanup()
+        await api_runner.cleanup()
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> bool:
+    ok = True
+    print(f"\n{'тип':<8}{'p95 было':>12}{'p95 стало':>12}{'Δ':>9}{'SQL было':>10}{'SQL стало':>11}")
+    for kind, cur in current["by_type"].items():
+        base = baseline["by_type"].get(kind)
+        if not base:
+            continue
+        delta = (cur["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        flag  = ""
+        if delta > max_regression or cur["db_queries_avg"] > base["db_queries_avg"]:
+            flag, ok = "  ⚠", False
+        print(f"{kind:<8}{base['p95_ms']:>12}{cur['p95_ms']:>12}{delta:>+9.0%}"
+              f"{base['db_queries_avg']:>10}{cur['db_queries_avg']:>11}{flag}")
+    return ok
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates",     type=int,   default=2000)
+    parser.add_argument("--concurrency", type=int,   default=50, help="одновременных HTTP-запросов к webhook")
+    parser.add_argument("--users",       type=int,   default=500)
+    parser.add_argument("--forecasts",   type=int,   default=20, help="прогнозов на категорию")
+    parser.add_argument("--mix",         default=DEFAULT_MIX, help=f"веса типов апдейтов, по умолчанию {DEFAULT_MIX}")
+    parser.add_argument("--api-latency", type=float, default=30.0, help="задержка заглушки Bot API, мс")
+    parser.add_argument("--api-jitter",  type=float, default=10.0)
+    parser.add_argument("--timeout",     type=float, default=120.0)
+    parser.add_argument("--out",         help="куда сохранить JSON с результатами")
+    parser.add_argument("--compare",     help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="допустимый рост p95, доля")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare(result, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
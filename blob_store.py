@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+
+import aiofiles
+import aiofiles.os
+from aiogram import Bot
+
+# ────────────────────────────────────────────────────────────
+#   Хранилище картинок прогнозов
+# ────────────────────────────────────────────────────────────
+#   Файл качается потоком прямо на диск, по пути считается sha256,
+#   и картинка сохраняется как forecasts/<sport>/<sha256>.jpg —
+#   одинаковые изображения хранятся один раз, а имя не зависит от
+#   содержимого папки. Вся работа с ФС идёт мимо event loop.
+
+
+@dataclass
+class StoredBlob:
+    file_name: str
+    file_path: str
+    sha256:    str
+    size:      int
+    duplicate: bool                               # такой файл уже лежал на диске
+
+
+class BlobStore:
+    def __init__(self, root: str = "forecasts", chunk_size: int = 65536):
+        self.root       = root
+        self.chunk_size = chunk_size
+
+    def folder(self, sport: str) -> str:
+        return os.path.join(self.root, sport)
+
+    async def save_from_telegram(self, bot: Bot, file_id: str, sport: str) -> StoredBlob:
+        file = await bot.get_file(file_id)
+        url  = bot.session.api.file_url(bot.token, file.file_path)
+        return await self.save_stream(
+            bot.session.stream_content(url=url, chunk_size=self.chunk_size), sport
+        )
+
+    async def save_stream(self, stream, sport: str) -> StoredBlob:
+        folder = self.folder(sport)
+        await aiofiles.os.makedirs(folder, exist_ok=True)
+        tmp    = os.path.join(folder, f".{uuid.uuid4().hex}.part")
+        digest = hashlib.sha256()
+        size   = 0
+        try:
+            async with aiofiles.open(tmp, "wb") as f:
+                async for chunk in stream:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            await self._silent_remove(tmp)
+            raise
+
+        sha       = digest.hexdigest()
+        file_name = f"{sha}.jpg"
+        path      = os.path.join(folder, file_name)
+        duplicate = await aiofiles.os.path.exists(path)
+        if duplicate:
+            await aiofiles.os.remove(tmp)
+        else:
+            await aiofiles.os.replace(tmp, path)
+        return StoredBlob(file_name, path, sha, size, duplicate)
+
+    async def save_bytes(self, data: bytes, sport: str) -> StoredBlob:
+        async def one_chunk():
+            yield data
+        return await self.save_stream(one_chunk(), sport)
+
+    async def remove(self, paths: list[str]) -> None:
+        await asyncio.to_thread(self._remove_sync, paths)
+
+    async def clear(self, sports: list[str]) -> None:
+        await asyncio.to_thread(self._clear_sync, [self.folder(s) for s in sports])
+
+    @staticmethod
+    def _remove_sync(paths: list[str]) -> None:
+        for p in paths:
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _clear_sync(folders: list[str]) -> None:
+        for folder in folders:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    @staticmethod
+    async def _silent_remove(path: str) -> None:
+        try:
+            await aiofiles.os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import time
+import uuid
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────
+#   Рассылки всем пользователям
+# ────────────────────────────────────────────────────────────
+#   Рассылка и её адресаты хранятся в broadcasts / broadcast_targets,
+#   поэтому после рестарта незавершённые рассылки продолжаются
+#   с того места, где остановились. Скорость ограничена общим
+#   token bucket (лимит Telegram ~30 сообщений в секунду).
+#   Незавершённую рассылку подхватывает каждый процесс, но шлёт только
+#   один — владелец аренды в broadcast_sender (продлевается перед каждой
+#   страницей), поэтому token bucket действительно общий для всех рассылок
+#   и процессов. Остальные ждут и забирают аренду, если владелец пропал.
+#   Если аренда истекла посреди страницы (долгий flood-wait), остаток
+#   страницы не отправляется и возвращается в очередь. Адресатов берут
+#   страницами в аренду (leased_until, SKIP LOCKED), результаты пишутся
+#   после каждой страницы — при падении повторно уйдёт не больше неё.
+
+PENDING, SENT, FAILED = 0, 1, 2
+
+HOLD_SENDER_SQL = """
+    INSERT INTO broadcast_sender (id, owner, leased_until)
+    VALUES (TRUE, :me, NOW() + make_interval(secs => CAST(:lease AS DOUBLE PRECISION)))
+    ON CONFLICT (id) DO UPDATE
+       SET owner = EXCLUDED.owner, leased_until = EXCLUDED.leased_until
+     WHERE broadcast_sender.owner = EXCLUDED.owner OR broadcast_sender.leased_until < NOW()
+    RETURNING owner
+"""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int | None = None):
+        self.rate     = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens  = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Flood-wait от Telegram: останавливаем всех отправителей."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BroadcastProgress:
+    def __init__(self, total: int, done: int):
+        self.total   = total
+        self.sent    = 0
+        self.failed  = 0
+        self.skipped = done                       # отправлено до рестарта
+        self.started = time.monotonic()
+
+    @property
+    def processed(self) -> int:
+        return self.skipped + self.sent + self.failed
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return (self.sent + self.failed) / elapsed if elapsed > 0 else 0.0
+
+
+class BroadcastEngine:
+    def __init__(self, bot: Bot, database: Database,
+                 rate: float = 25.0, concurrency: int = 20, page_size: int = 50,
+                 lease: float = 300.0, idle_wait: float = 5.0, sender_lease: float = 30.0):
+        self.bot         = bot
+        self.database    = database
+        self.bucket      = TokenBucket(rate)
+        self.concurrency = concurrency
+        self.page_size   = page_size
+        self.lease       = lease                  # сек. аренды страницы адресатов
+        self.idle_wait   = idle_wait              # пауза, пока чужие страницы в аренде
+        self.sender_lease = sender_lease          # сек. аренды права отправлять
+        self._owner = uuid.uuid4().hex
+        self._sender_until = 0.0                  # time.monotonic(), до которого аренда точно наша
+        self.progress: dict[int, BroadcastProgress] = {}
+        self._tasks:   dict[int, asyncio.Task] = {}
+
+    async def start(self, text: str) -> int:
+        async with self.database.transaction():
+            bid = await self.database.fetch_val(
+                "INSERT INTO broadcasts (text) VALUES (:t) RETURNING id", values={"t": text}
+            )
+            total = await self.database.fetch_val(
+                "WITH t AS ("
+                "  INSERT INTO broadcast_targets (broadcast_id, user_id) "
+                "  SELECT CAST(:b AS INT), user_id FROM users RETURNING 1"
+                ") SELECT COUNT(*) FROM t",
+                values={"b": bid}
+            )
+            await self.database.execute(
+                "UPDATE broadcasts SET total = :n WHERE id = :b", values={"n": total, "b": bid}
+            )
+        self._spawn(bid, text)
+        return bid
+
+    async def resume(self) -> None:
+        rows = await self.database.fetch_all(
+            "SELECT id, text FROM broadcasts WHERE status = 'running' ORDER BY id"
+        )
+        for r in rows:
+            logger.info("Продолжаем рассылку #%s", r["id"])
+            self._spawn(r["id"], r["text"])
+
+    async def stop(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        if self._sender_until:                    # отдаём аренду сразу, не дожидаясь её истечения
+            self._sender_until = 0.0
+            try:
+                await self.database.execute(
+                    "DELETE FROM broadcast_sender WHERE owner = :me", values={"me": self._owner}
+                )
+            except Exception:
+                logger.exception("Не удалось освободить аренду отправителя рассылок")
+
+    async def recent(self, limit: int = 5) -> list:
+        return await self.database.fetch_all("""
+            SELECT b.id, b.status, b.total,
+                   COUNT(*) FILTER (WHERE t.status = 1) AS sent,
+                   COUNT(*) FILTER (WHERE t.status = 2) AS failed
+            FROM broadcasts b
+            LEFT JOIN broadcast_targets t ON t.broadcast_id = b.id
+            GROUP BY b.id
+            ORDER BY b.id DESC
+            LIMIT :n
+        """, values={"n": limit})
+
+    def _spawn(self, bid: int, text: str) -> None:
+        if bid not in self._tasks:
+            self._tasks[bid] = asyncio.create_task(self._run(bid, text))
+
+    async def _run(self, bid: int, text: str) -> None:
+        try:
+            row = await self.database.fetch_one(
+                "SELECT COUNT(*) AS total, COUNT(*) FILTER (WHERE status <> 0) AS done "
+                "FROM broadcast_targets WHERE broadcast_id = :b",
+                values={"b": bid}
+            )
+            progress = self.progress[bid] = BroadcastProgress(row["total"], row["done"])
+
+            while True:
+                if not await self._hold_sender():
+                    await asyncio.sleep(self.idle_wait)   # шлёт другой процесс
+                    continue
+                page = await self._claim_page(bid)
+                if not page:
+                    left = await self.database.fetch_val(
+                        "SELECT COUNT(*) FROM broadcast_targets WHERE broadcast_id = :b AND status = 0",
+                        values={"b": bid}
+                    )
+                    if not left:
+                        break
+                    await asyncio.sleep(self.idle_wait)   # остаток в аренде у других процессов
+                    continue
+                results = await self._send_page(text, page)
+                await self._save_results(bid, results, page)
+                progress.sent   += sum(1 for s in results.values() if s == SENT)
+                progress.failed += sum(1 for s in results.values() if s == FAILED)
+
+            await self.database.execute(
+                "UPDATE broadcasts SET status = 'done', finished_at = NOW() "
+                "WHERE id = :b AND status = 'running'",
+                values={"b": bid}
+            )
+            logger.info("Рассылка #%s завершена: %s отправлено, %s ошибок, %.1f msg/s",
+                        bid, progress.sent, progress.failed, progress.rate)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Рассылка #%s прервана", bid)
+        finally:
+            self._tasks.pop(bid, None)
+
+    async def _hold_sender(self) -> bool:
+        """Берёт или продлевает аренду отправителя; False — она у другого процесса."""
+        started = time.monotonic()                # отсчёт до запроса: локальный срок не позже серверного
+        owner = await self.database.fetch_val(
+            HOLD_SENDER_SQL, values={"me": self._owner, "lease": self.sender_lease}
+        )
+        if owner is None:
+            self._sender_until = 0.0
+            return False
+        self._sender_until = started + self.sender_lease
+        return True
+
+    async def _claim_page(self, bid: int) -> list[int]:
+        rows = await self.database.fetch_all("""
+            UPDATE broadcast_targets t
+               SET leased_until = NOW() + make_interval(secs => CAST(:lease AS DOUBLE PRECISION))
+            FROM (
+                SELECT user_id FROM broadcast_targets
+                WHERE broadcast_id = :b AND status = 0
+                  AND (leased_until IS NULL OR leased_until < NOW())
+                ORDER BY user_id
+                LIMIT :n
+                FOR UPDATE SKIP LOCKED
+            ) page
+            WHERE t.broadcast_id = :b AND t.user_id = page.user_id
+            RETURNING t.user_id
+        """, values={"b": bid, "n": self.page_size, "lease": self.lease})
+        return [r["user_id"] for r in rows]
+
+    async def _send_page(self, text: str, user_ids: list[int]) -> dict[int, int]:
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for uid in user_ids:
+            queue.put_nowait(uid)
+        results: dict[int, int] = {}
+
+        async def worker():
+            while not queue.empty():
+                uid = queue.get_nowait()
+                await self.bucket.acquire()
+                if time.monotonic() >= self._sender_until:
+                    return                        # аренда истекла — остаток страницы не шлём
+                try:
+                    await self.bot.send_message(uid, text)
+                    results[uid] = SENT
+                except TelegramRetryAfter as e:
+                    logger.warning("Flood-wait %s с, рассылка на паузе", e.retry_after)
+                    self.bucket.pause(e.retry_after)
+                    queue.put_nowait(uid)
+                except TelegramAPIError:              # заблокировал бота, удалил аккаунт и т.п.
+                    results[uid] = FAILED
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(user_ids)))))
+        return results
+
+    async def _save_results(self, bid: int, results: dict[int, int], page: list[int]) -> None:
+        for status in (SENT, FAILED):
+            ids = [uid for uid, s in results.items() if s == status]
+            if ids:
+                await self.database.execute(
+                    "UPDATE broadcast_targets SET status = :s "
+                    "WHERE broadcast_id = :b AND user_id = ANY(CAST(:ids AS BIGINT[]))",
+                    values={"s": status, "b": bid, "ids": ids}
+                )
+        unsent = [uid for uid in page if uid not in results]
+        if unsent:
+            await self.database.execute(
+                "UPDATE broadcast_targets SET leased_until = NULL "
+                "WHERE broadcast_id = :b AND user_id = ANY(CAST(:ids AS BIGINT[]))",
+                values={"b": bid, "ids": unsent}
+            )
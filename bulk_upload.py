@@ -0,0 +1,75 @@
+import asyncio
+import io
+import logging
+import os
+import zipfile
+from collections.abc import Awaitable, Callable
+
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────
+#   Массовая загрузка прогнозов (альбомы и ZIP)
+# ────────────────────────────────────────────────────────────
+#   Telegram присылает альбом отдельными сообщениями с общим
+#   media_group_id. Коллектор копит их и, когда новые части
+#   перестают приходить, отдаёт весь альбом разом в фоне — хэндлер
+#   не ждёт, так что остальные части альбома не стоят в очереди.
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+class AlbumCollector:
+    def __init__(self, latency: float = 1.0):
+        self.latency = latency
+        self._albums: dict[str, list[Message]] = {}
+        self._timers: dict[str, asyncio.Task] = {}
+
+    def add(self, message: Message, on_complete: Callable[[list[Message]], Awaitable[None]]) -> None:
+        group = message.media_group_id
+        self._albums.setdefault(group, []).append(message)
+        timer = self._timers.get(group)
+        if timer is not None:
+            timer.cancel()
+        self._timers[group] = asyncio.create_task(self._fire(group, on_complete))
+
+    async def _fire(self, group: str, on_complete) -> None:
+        await asyncio.sleep(self.latency)
+        self._timers.pop(group, None)
+        album = sorted(self._albums.pop(group, []), key=lambda m: m.message_id)
+        try:
+            await on_complete(album)
+        except Exception:
+            logger.exception("Не удалось обработать альбом %s", group)
+
+
+def read_zip_images(data: bytes, categories: list[str]) -> tuple[list[tuple[str, bytes]], int]:
+    """Картинки из архива вида <sport>/<файл>; второе значение — сколько файлов пропущено."""
+    images, skipped = [], 0
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            parts = [p for p in info.filename.split("/") if p]
+            sport = next((p.lower() for p in parts[:-1] if p.lower() in categories), None)
+            if sport is None or not parts[-1].lower().endswith(IMAGE_EXTENSIONS) \
+                    or os.path.basename(parts[-1]).startswith("."):
+                skipped += 1
+                continue
+            images.append((sport, archive.read(info)))
+    return images, skipped
+
+
+async def gather_limited(limit: int, coros: list[Awaitable]) -> list:
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            try:
+                return await coro
+            except Exception:
+                logger.exception("Ошибка при массовой загрузке")
+                raise
+
+    return await asyncio.gather(*(run(c) for c in coros), return_exceptions=True)
@@ -1,20 +1,121 @@
-from sqlalchemy import Column, Integer, String, Text
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
-import os
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-engine = create_async_engine(DATABASE_URL, echo=False)
-async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-Base = declarative_base()
-
-class Forecast(Base):
-    __tablename__ = "forecasts"
-    id = Column(Integer, primary_key=True)
-    category = Column(String(50))  # football, cs, tennis
-    text = Column(Text)
-
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+import contextvars
+import re
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any
+
+import asyncpg
+
+# ────────────────────────────────────────────────────────────
+#   Доступ к Postgres: один пул asyncpg
+# ────────────────────────────────────────────────────────────
+#   Интерфейс повторяет databases.Database (execute / fetch_* /
+#   transaction с параметрами вида :name), поэтому остальной код
+#   не зависит от драйвера. Именованные параметры один раз на текст
+#   запроса переводятся в $1…$n, так что текст каждый раз одинаковый
+#   и asyncpg берёт подготовленный запрос из своего кэша на соединении.
+
+_PARAM = re.compile(r"(?<![:\w]):(\w+)")
+_UNSET = object()
+
+
+@lru_cache(maxsize=1024)
+def compile_query(query: str) -> tuple[str, tuple[str, ...]]:
+    names: list[str] = []
+
+    def sub(m: re.Match) -> str:
+        name = m.group(1)
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+
+    return _PARAM.sub(sub, query), tuple(names)
+
+
+class Database:
+    def __init__(self, url: str, min_size: int = 2, max_size: int = 10,
+                 query_timeout: float | None = 10.0, statement_cache_size: int = 512,
+                 **connect_kwargs: Any):
+        self.url           = url
+        self.min_size      = min_size
+        self.max_size      = max_size
+        self.query_timeout = query_timeout
+        self.statement_cache_size = statement_cache_size
+        self.connect_kwargs = connect_kwargs
+        self.pool: asyncpg.Pool | None = None
+        self._connection: contextvars.ContextVar[asyncpg.Connection | None] = \
+            contextvars.ContextVar(f"db_connection_{id(self)}", default=None)
+        self._timeout: contextvars.ContextVar[float | None] = \
+            contextvars.ContextVar(f"db_timeout_{id(self)}", default=query_timeout)
+
+    @property
+    def is_connected(self) -> bool:
+        return self.pool is not None
+
+    async def connect(self) -> None:
+        if self.pool is None:
+            self.pool = await asyncpg.create_pool(
+                self.url,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                statement_cache_size=self.statement_cache_size,
+                max_cached_statement_lifetime=0,  # запросы у бота фиксированные, держим их всё время жизни соединения
+                **self.connect_kwargs,
+            )
+
+    async def disconnect(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def execute(self, query: str, values: dict | None = None) -> str:
+        return await self._run("execute", query, values)
+
+    async def execute_many(self, query: str, values: list[dict]) -> None:
+        sql, names = compile_query(query)
+        args = [tuple(v[n] for n in names) for v in values]
+        conn = self._connection.get()
+        target = conn if conn is not None else self.pool
+        await target.executemany(sql, args, timeout=self._timeout.get())
+
+    async def fetch_all(self, query: str, values: dict | None = None) -> list[asyncpg.Record]:
+        return await self._run("fetch", query, values)
+
+    async def fetch_one(self, query: str, values: dict | None = None) -> asyncpg.Record | None:
+        return await self._run("fetchrow", query, values)
+
+    async def fetch_val(self, query: str, values: dict | None = None, column: int = 0) -> Any:
+        row = await self._run("fetchrow", query, values)
+        return None if row is None else row[column]
+
+    @asynccontextmanager
+    async def transaction(self, timeout: Any = _UNSET):
+        """Запросы этой задачи внутри блока идут через одно соединение в транзакции.
+
+        timeout заменяет query_timeout для запросов блока, None — без ограничения
+        (миграции: ожидание advisory lock и перенос данных бывают долгими).
+        """
+        timeout_token = self._timeout.set(timeout) if timeout is not _UNSET else None
+        try:
+            conn = self._connection.get()
+            if conn is not None:                  # вложенная — savepoint
+                async with conn.transaction():
+                    yield conn
+                return
+            async with self.pool.acquire() as conn:
+                token = self._connection.set(conn)
+                try:
+                    async with conn.transaction():
+                        yield conn
+                finally:
+                    self._connection.reset(token)
+        finally:
+            if timeout_token is not None:
+                self._timeout.reset(timeout_token)
+
+    async def _run(self, method: str, query: str, values: dict | None) -> Any:
+        sql, names = compile_query(query)
+        args = [values[n] for n in names] if names else []
+        conn = self._connection.get()
+        target = conn if conn is not None else self.pool
+        return await getattr(target, method)(sql, *args, timeout=self._timeout.get())
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from database import Database
+
+# ────────────────────────────────────────────────────────────
+#   Индекс доступных прогнозов
+# ────────────────────────────────────────────────────────────
+#   Множества id прогнозов хранятся битовыми масками (int): бит N
+#   установлен, если прогноз с id N есть в категории / уже выдан
+#   пользователю. Доступные прогнозы = каталог категории & ~выданные,
+#   поэтому меню на попадании в кэш вообще не ходит в Postgres.
+#   Выданные прогнозы держим для capacity последних пользователей (LRU)
+#   и не дольше ttl секунд: выдачи из других процессов сюда не приходят,
+#   поэтому маска периодически перечитывается, а пустой claim сбрасывает
+#   её сразу (forget_delivered).
+#   Биты отсчитываются от base — наименьшего id в каталоге, чтобы маски
+#   не росли вместе с последовательностью id; при архивации старых
+#   прогнозов base сдвигается вперёд.
+#   Изменения каталога в других процессах приходят через NOTIFY
+#   (invalidate), после чего каталог перечитывается при обращении.
+
+
+def iter_bits(mask: int, base: int = 0):
+    while mask:
+        low = mask & -mask
+        yield base + low.bit_length() - 1
+        mask ^= low
+
+
+class ForecastIndex:
+    def __init__(self, database: Database, categories: list[str], capacity: int = 10000, ttl: float = 60.0):
+        self.database   = database
+        self.categories = categories
+        self.capacity   = capacity
+        self.ttl        = ttl
+        self._catalog: dict[str, int] | None = None
+        self._stale = False
+        self._base = 0
+        self._delivered: OrderedDict[int, int] = OrderedDict()
+        self._loaded: dict[int, float] = {}       # user_id → time.monotonic() загрузки маски
+        self._lock = asyncio.Lock()
+        self.hits   = 0
+        self.misses = 0
+
+    async def available(self, user_id: int) -> dict[str, list[int]]:
+        await self._get_catalog()
+        delivered = await self._get_delivered(user_id)
+        catalog   = self._catalog                 # после await: каталог могли пересдвинуть
+        return {s: list(iter_bits(catalog[s] & ~delivered, self._base)) for s in self.categories}
+
+    async def counts(self, user_id: int) -> dict[str, int]:
+        await self._get_catalog()
+        delivered = await self._get_delivered(user_id)
+        catalog   = self._catalog
+        return {s: (catalog[s] & ~delivered).bit_count() for s in self.categories}
+
+    async def warm(self) -> None:
+        """Загружает каталог заранее, чтобы первый пользователь не ждал запроса."""
+        await self._get_catalog()
+
+    def add_forecast(self, forecast_id: int, sport: str) -> None:
+        if self._catalog is None:
+            return
+        if forecast_id < self._base or not any(self._catalog.values()):
+            self._rebase(forecast_id)             # меньший id (параллельные загрузки) или пустой каталог
+        self._catalog[sport] = self._catalog.get(sport, 0) | self._bit(forecast_id)
+
+    def mark_delivered(self, user_id: int, forecast_id: int) -> None:
+        if user_id in self._delivered:
+            self._delivered[user_id] |= self._bit(forecast_id)
+
+    def unmark_delivered(self, user_id: int, forecast_id: int) -> None:
+        if user_id in self._delivered:
+            self._delivered[user_id] &= ~self._bit(forecast_id)
+
+    def forget_delivered(self, user_id: int) -> None:
+        """Маска могла устареть (выдача в другом процессе): перечитаем при обращении."""
+        self._delivered.pop(user_id, None)
+        self._loaded.pop(user_id, None)
+
+    def remove_forecasts(self, forecast_ids: list[int]) -> None:
+        """Прогнозы ушли в архив: убираем их биты и сдвигаем base к новому минимуму."""
+        if self._catalog is None:
+            return
+        gone = 0
+        for fid in forecast_ids:
+            gone |= self._bit(fid)
+        self._catalog = {s: m & ~gone for s, m in self._catalog.items()}
+        for uid, mask in self._delivered.items():
+            self._delivered[uid] = mask & ~gone
+        lowest = min(((m & -m).bit_length() - 1 for m in self._catalog.values() if m), default=0)
+        self._rebase(self._base + lowest)
+
+    def invalidate(self) -> None:
+        """Каталог изменил другой процесс: перечитаем его при следующем обращении."""
+        self._stale = True
+
+    def clear(self) -> None:
+        """После TRUNCATE прогнозов и выдач: выданных нет, каталог перечитаем —
+        прогнозы, загруженные после очистки, в нём уже могут быть."""
+        self.invalidate()
+        self._delivered.clear()
+        self._loaded.clear()
+
+    async def _get_catalog(self) -> dict[str, int]:
+        if self._catalog is None or self._stale:
+            async with self._lock:
+                if self._catalog is None or self._stale:
+                    self._stale = False           # уведомление во время чтения снова поднимет флаг
+                    rows = await self.database.fetch_all("SELECT id, sport FROM forecasts")
+                    self._rebase(min((r["id"] for r in rows), default=self._base))
+                    catalog = {s: 0 for s in self.categories}
+                    for r in rows:
+                        catalog[r["sport"]] = catalog.get(r["sport"], 0) | self._bit(r["id"])
+                    self._catalog = catalog
+        return self._catalog
+
+    async def _get_delivered(self, user_id: int) -> int:
+        mask = self._delivered.get(user_id)
+        if mask is not None and time.monotonic() - self._loaded[user_id] < self.ttl:
+            self.hits += 1
+            self._delivered.move_to_end(user_id)
+            return mask
+
+        self.misses += 1
+        if mask is not None:
+            self._delivered[user_id] = 0          # устаревшая маска: копим только выдачи во время запроса
+        # только секции живых прогнозов: граница известна на старте запроса, лишние секции отсекаются
+        rows = await self.database.fetch_all(
+            "SELECT forecast_id FROM deliveries "
+            "WHERE user_id = :uid AND publish_date >= (SELECT MIN(publish_date) FROM forecasts)",
+            values={"uid": user_id}
+        )
+        mask = 0
+        for r in rows:
+            mask |= self._bit(r["forecast_id"])
+        # выдача могла случиться, пока мы ждали БД
+        mask |= self._delivered.get(user_id, 0)
+        self._delivered[user_id] = mask
+        self._loaded[user_id] = time.monotonic()
+        self._delivered.move_to_end(user_id)
+        while len(self._delivered) > self.capacity:
+            evicted, _ = self._delivered.popitem(last=False)
+            self._loaded.pop(evicted, None)
+        return mask
+
+    def _rebase(self, base: int) -> None:
+        """Переносит маски на новую точку отсчёта base."""
+        shift = base - self._base
+        if not shift:
+            return
+        move = (lambda m: m >> shift) if shift > 0 else (lambda m: m << -shift)
+        if self._catalog is not None:
+            self._catalog = {s: move(m) for s, m in self._catalog.items()}
+        for uid, mask in self._delivered.items():
+            self._delivered[uid] = move(mask)
+        self._base = base
+
+    def _bit(self, forecast_id: int) -> int:
+        return 1 << (forecast_id - self._base) if forecast_id >= self._base else 0
@@ -0,0 +1,145 @@
+import asyncio
+import copy
+import json
+import logging
+import time
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────
+#   FSM-хранилище в Postgres
+# ────────────────────────────────────────────────────────────
+#   Состояние и данные FSM лежат в таблице fsm_storage, поэтому их
+#   видят все процессы бота и они переживают рестарт. Запись идёт
+#   пачками раз в flush_interval секунд (повторные изменения одного
+#   ключа схлопываются), чтение — через локальный кэш с TTL.
+#   cache_ttl — окно, в котором процесс может не увидеть запись
+#   соседнего процесса; 0 отключает кэш.
+
+UPSERT_SQL = """
+    INSERT INTO fsm_storage (key, state, data, updated_at)
+    SELECT k, s, CAST(d AS JSONB), NOW()
+    FROM unnest(CAST(:keys AS TEXT[]), CAST(:states AS TEXT[]), CAST(:datas AS TEXT[])) AS r(k, s, d)
+    ON CONFLICT (key) DO UPDATE
+       SET state = EXCLUDED.state, data = EXCLUDED.data, updated_at = EXCLUDED.updated_at
+"""
+
+
+class PostgresStorage(BaseStorage):
+    def __init__(self, database: Database, key_builder: KeyBuilder | None = None,
+                 cache_ttl: float = 2.0, flush_interval: float = 0.05, max_pending: int = 500):
+        self.database       = database
+        self.key_builder    = key_builder or DefaultKeyBuilder(with_destiny=True)
+        self.cache_ttl      = cache_ttl
+        self.flush_interval = flush_interval
+        self.max_pending    = max_pending
+        self._cache:   dict[str, tuple[float, str | None, dict]] = {}
+        self._pending:  dict[str, tuple[str | None, dict]] = {}
+        self._inflight: dict[str, tuple[str | None, dict]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task:     asyncio.Task | None = None
+        self._overflow: asyncio.Task | None = None
+        self._evicted_at = time.monotonic()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        k = self.key_builder.build(key)
+        _, data = await self._load(k)
+        self._write(k, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await self._load(self.key_builder.build(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        k = self.key_builder.build(key)
+        state, _ = await self._load(k)
+        self._write(k, state, copy.deepcopy(dict(data)))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self._load(self.key_builder.build(key))
+        return copy.deepcopy(data)
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch = self._inflight = self._pending
+            self._pending = {}
+            empty = [k for k, (s, d) in batch.items() if s is None and not d]
+            rows  = {k: v for k, v in batch.items() if k not in empty}
+            try:
+                if rows:
+                    await self.database.execute(UPSERT_SQL, values={
+                        "keys":   list(rows),
+                        "states": [s for s, _ in rows.values()],
+                        "datas":  [json.dumps(d, ensure_ascii=False) for _, d in rows.values()],
+                    })
+                if empty:
+                    await self.database.execute(
+                        "DELETE FROM fsm_storage WHERE key = ANY(CAST(:keys AS TEXT[]))",
+                        values={"keys": empty}
+                    )
+            except Exception:
+                self._pending = {**batch, **self._pending}
+                raise
+            finally:
+                self._inflight = {}
+
+    def _write(self, k: str, state: str | None, data: dict) -> None:
+        self._pending[k] = (state, data)
+        self._cache[k] = (time.monotonic() + self.cache_ttl, state, data)
+        if len(self._pending) >= self.max_pending and (self._overflow is None or self._overflow.done()):
+            self._overflow = asyncio.create_task(self.flush())
+
+    async def _load(self, k: str) -> tuple[str | None, dict]:
+        if k in self._pending or k in self._inflight:
+            return self._pending.get(k) or self._inflight[k]
+        cached = self._cache.get(k)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1], cached[2]
+
+        row = await self.database.fetch_one(
+            "SELECT state, data FROM fsm_storage WHERE key = :k", values={"k": k}
+        )
+        state, data = (row["state"], row["data"]) if row else (None, {})
+        if isinstance(data, str):
+            data = json.loads(data)
+        if k in self._pending:                    # пока ждали БД, ключ успели изменить
+            return self._pending[k]
+        self._cache[k] = (time.monotonic() + self.cache_ttl, state, data)
+        return state, data
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - self._evicted_at > max(self.cache_ttl, 1.0):
+                    self._evict()
+            except Exception:
+                logger.exception("Не удалось записать FSM-данные")
+
+    def _evict(self) -> None:
+        now = self._evicted_at = time.monotonic()
+        for k in [k for k, (expires, _, _) in self._cache.items() if expires <= now]:
+            del self._cache[k]
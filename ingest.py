@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from metrics import Registry
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────
+#   Очередь входящих апдейтов
+# ────────────────────────────────────────────────────────────
+#   Webhook только кладёт апдейт в очередь и сразу отвечает 200,
+#   обработку ведут фоновые воркеры. Лимит maxsize — на всю очередь:
+#   переполнение даёт 503 только когда отстают все, а не один чат.
+#   Порядок внутри чата держит цепочка: пока апдейт чата в обработке
+#   или ждёт воркера, следующие апдейты этого чата копятся в его хвосте
+#   и встают в общую очередь по одному. Медленный чат занимает не больше
+#   одного воркера, остальные чаты обрабатываются без ожидания.
+
+
+class QueueFull(Exception):
+    pass
+
+
+def chat_key(update: Update) -> int:
+    try:
+        event = update.event
+    except Exception:
+        return update.update_id
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    return user.id if user is not None else update.update_id
+
+
+class UpdateQueue:
+    def __init__(self, dp: Dispatcher, bot: Bot, workers: int = 8, maxsize: int = 1000,
+                 registry: Registry | None = None):
+        self.dp   = dp
+        self.bot  = bot
+        self.workers  = workers
+        self.maxsize  = maxsize
+        self.registry = registry
+        self._ready: asyncio.Queue = asyncio.Queue()    # по одному апдейту на чат; лимит считаем сами
+        self._chains: dict[int, deque] = {}             # чат → апдейты, ждущие предыдущего
+        self._depth = 0
+        self._tasks: list[asyncio.Task] = []
+        self.processed = 0
+        self.failed    = 0
+        self.dropped   = 0
+        self.last_lag  = 0.0                      # сек. от приёма до начала обработки
+        self.max_lag   = 0.0
+        if registry is not None:
+            registry.inc("bot_update_queue_dropped_total", {}, 0)   # счётчик виден с нуля
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def put(self, update: Update) -> None:
+        if self._depth >= self.maxsize:
+            self.dropped += 1
+            if self.registry is not None:
+                self.registry.inc("bot_update_queue_dropped_total", {})
+            raise QueueFull
+        self._depth += 1
+        item = (time.monotonic(), chat_key(update), update)
+        chain = self._chains.get(item[1])
+        if chain is None:
+            self._chains[item[1]] = deque()
+            self._ready.put_nowait(item)
+        else:
+            chain.append(item)
+
+    def stats(self) -> dict:
+        return {
+            "depth":     self.depth,
+            "workers":   self.workers,
+            "chats":     len(self._chains),
+            "processed": self.processed,
+            "failed":    self.failed,
+            "dropped":   self.dropped,
+            "last_lag":  round(self.last_lag, 3),
+            "max_lag":   round(self.max_lag, 3),
+        }
+
+    async def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Не дождались обработки %s апдейтов при остановке", self.depth)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self) -> None:
+        while True:
+            received, key, update = await self._ready.get()
+            self._depth -= 1
+            self.last_lag = time.monotonic() - received
+            self.max_lag  = max(self.max_lag, self.last_lag)
+            try:
+                await self.dp.feed_update(self.bot, update)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Ошибка обработки апдейта %s", update.update_id)
+            finally:
+                chain = self._chains[key]
+                if chain:
+                    self._ready.put_nowait(chain.popleft())   # следующий апдейт чата — в конец общей очереди
+                else:
+                    del self._chains[key]
+                self._ready.task_done()
@@ -0,0 +1,235 @@
+import bisect
+import contextvars
+import logging
+import re
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────
+#   Метрики (формат Prometheus)
+# ────────────────────────────────────────────────────────────
+#   Гистограммы задержек по хэндлерам, SQL-запросам и методам Bot API
+#   плюс счётчики ошибок. Для медленных апдейтов (дольше порога)
+#   в лог пишется разбивка времени по всем вызовам внутри апдейта.
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+current_trace: contextvars.ContextVar["UpdateTrace | None"] = contextvars.ContextVar("current_trace", default=None)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum    = 0.0
+        self.count  = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum   += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self.histograms: dict[str, dict[tuple, Histogram]] = defaultdict(lambda: defaultdict(Histogram))
+        self.counters:   dict[str, dict[tuple, float]]     = defaultdict(lambda: defaultdict(float))
+        self.gauges:     dict[str, Callable[[], float]]    = {}
+        self.help:       dict[str, str] = {}
+
+    def observe(self, name: str, labels: dict[str, str], value: float) -> None:
+        self.histograms[name][tuple(labels.items())].observe(value)
+
+    def inc(self, name: str, labels: dict[str, str], value: float = 1.0) -> None:
+        self.counters[name][tuple(labels.items())] += value
+
+    def gauge(self, name: str, fn: Callable[[], float], help_text: str = "") -> None:
+        self.gauges[name] = fn
+        self.help[name]   = help_text
+
+    def describe(self, name: str, help_text: str) -> None:
+        self.help[name] = help_text
+
+    def render(self) -> str:
+        out = []
+        for name, series in sorted(self.histograms.items()):
+            self._header(out, name, "histogram")
+            for labels, h in sorted(series.items()):
+                cumulative = 0
+                for bound, n in zip((*BUCKETS, "+Inf"), h.counts):
+                    cumulative += n
+                    out.append(f"{name}_bucket{_labels(labels, le=str(bound))} {cumulative}")
+                out.append(f"{name}_sum{_labels(labels)} {h.sum}")
+                out.append(f"{name}_count{_labels(labels)} {h.count}")
+        for name, series in sorted(self.counters.items()):
+            self._header(out, name, "counter")
+            for labels, value in sorted(series.items()):
+                out.append(f"{name}{_labels(labels)} {value}")
+        for name, fn in sorted(self.gauges.items()):
+            self._header(out, name, "gauge")
+            out.append(f"{name} {fn()}")
+        return "\n".join(out) + "\n"
+
+    def _header(self, out: list[str], name: str, kind: str) -> None:
+        if name in self.help:
+            out.append(f"# HELP {name} {self.help[name]}")
+        out.append(f"# TYPE {name} {kind}")
+
+
+def _labels(labels: tuple, **extra: str) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def sql_label(query: str, limit: int = 120) -> str:
+    q = re.sub(r"\s+", " ", str(query)).strip()
+    return q if len(q) <= limit else q[:limit - 1] + "…"
+
+
+class UpdateTrace:
+    def __init__(self, update_id: int):
+        self.update_id = update_id
+        self.started   = time.perf_counter()
+        self.handler: str | None = None
+        self.calls: list[tuple[str, float]] = []
+
+    def add(self, what: str, seconds: float) -> None:
+        self.calls.append((what, seconds))
+
+    def format(self, total: float) -> str:
+        lines = [f"Медленный апдейт {self.update_id} ({self.handler or '—'}): {total * 1000:.1f} мс"]
+        lines += [f"    {seconds * 1000:8.1f} мс  {what}" for what, seconds in self.calls]
+        return "\n".join(lines)
+
+
+def _record(registry: Registry, kind: str, label: str, seconds: float, failed: bool) -> None:
+    registry.observe(f"bot_{kind}_seconds", {kind: label}, seconds)
+    if failed:
+        registry.inc(f"bot_{kind}_errors_total", {kind: label})
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(f"{kind} {label}", seconds)
+
+
+# ────────────────────────────────────────────────────────────
+#   Апдейты и хэндлеры
+# ────────────────────────────────────────────────────────────
+class UpdateTimingMiddleware(BaseMiddleware):
+    """Внешний middleware на dp.update: общее время апдейта и лог медленных."""
+
+    def __init__(self, registry: Registry, slow_threshold: float = 0.0):
+        self.registry       = registry
+        self.slow_threshold = slow_threshold
+
+    async def __call__(self, handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: dict[str, Any]) -> Any:
+        trace = UpdateTrace(event.update_id)
+        token = current_trace.set(trace)
+        failed = False
+        try:
+            return await handler(event, data)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            total = time.perf_counter() - trace.started
+            current_trace.reset(token)
+            self.registry.observe("bot_update_seconds", {"type": event.event_type}, total)
+            if failed:
+                self.registry.inc("bot_update_errors_total", {"type": event.event_type})
+            if self.slow_threshold and total >= self.slow_threshold:
+                logger.warning(trace.format(total))
+
+
+class HandlerTimingMiddleware(BaseMiddleware):
+    """Внутренний middleware: время конкретного хэндлера."""
+
+    def __init__(self, registry: Registry):
+        self.registry = registry
+
+    async def __call__(self, handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: dict[str, Any]) -> Any:
+        name  = data["handler"].callback.__name__ if "handler" in data else "unknown"
+        trace = current_trace.get()
+        if trace is not None:
+            trace.handler = name
+        started, failed = time.perf_counter(), False
+        try:
+            return await handler(event, data)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            _record(self.registry, "handler", name, time.perf_counter() - started, failed)
+
+
+# ────────────────────────────────────────────────────────────
+#   Bot API
+# ────────────────────────────────────────────────────────────
+class ApiTimingMiddleware(BaseRequestMiddleware):
+    def __init__(self, registry: Registry):
+        self.registry = registry
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod):
+        started, failed = time.perf_counter(), False
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            _record(self.registry, "api", method.__api_method__, time.perf_counter() - started, failed)
+
+
+# ────────────────────────────────────────────────────────────
+#   Postgres
+# ────────────────────────────────────────────────────────────
+class InstrumentedDatabase:
+    """Обёртка над Database: всё как у оригинала, но с замером запросов."""
+
+    def __init__(self, database: Database, registry: Registry):
+        self._database = database
+        self._registry = registry
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._database, name)
+
+    async def _timed(self, method: str, query, *args, **kwargs):
+        started, failed = time.perf_counter(), False
+        try:
+            return await getattr(self._database, method)(query, *args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            _record(self._registry, "sql", sql_label(query), time.perf_counter() - started, failed)
+
+    async def execute(self, query, values: dict | None = None):
+        return await self._timed("execute", query, values=values)
+
+    async def execute_many(self, query, values: list):
+        return await self._timed("execute_many", query, values=values)
+
+    async def fetch_all(self, query, values: dict | None = None):
+        return await self._timed("fetch_all", query, values=values)
+
+    async def fetch_one(self, query, values: dict | None = None):
+        return await self._timed("fetch_one", query, values=values)
+
+    async def fetch_val(self, query, values: dict | None = None, column: Any = 0):
+        return await self._timed("fetch_val", query, values=values, column=column)
@@ -0,0 +1,218 @@
+import logging
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────
+#   Миграции схемы
+# ────────────────────────────────────────────────────────────
+#   Каждая миграция — номер версии и список DDL. Применённые версии
+#   записываются в schema_migrations, при старте выполняются только
+#   новые, данные не трогаются. Все миграции идут в одной транзакции
+#   под advisory lock, поэтому два процесса не применят их дважды.
+#   Новые изменения схемы — только новой миграцией в конце списка;
+#   DDL записан здесь буквально, чтобы правка модуля не меняла старую
+#   миграцию.
+
+LOCK_KEY = 7_245_001                              # произвольный, но постоянный ключ pg_advisory_xact_lock
+
+MIGRATIONS: list[tuple[int, str, list[str]]] = [
+    (1, "базовая схема", [
+        """
+        CREATE TABLE IF NOT EXISTS forecasts (
+            id         SERIAL PRIMARY KEY,
+            sport      VARCHAR(50) NOT NULL,
+            file_name  VARCHAR(255) NOT NULL,
+            file_path  TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        # таблица могла остаться от старых версий бота без этих колонок
+        "ALTER TABLE forecasts ADD COLUMN IF NOT EXISTS tg_file_id TEXT;",
+        "ALTER TABLE forecasts ADD COLUMN IF NOT EXISTS sha256 CHAR(64);",
+        "ALTER TABLE forecasts ADD COLUMN IF NOT EXISTS size_bytes INT;",
+        "CREATE UNIQUE INDEX IF NOT EXISTS forecasts_sport_sha256 ON forecasts (sport, sha256);",
+        "CREATE INDEX IF NOT EXISTS forecasts_sport_id ON forecasts (sport, id);",   # выдача по порядку в категории
+        """
+        CREATE TABLE IF NOT EXISTS deliveries (
+            id          SERIAL PRIMARY KEY,
+            user_id     BIGINT NOT NULL,
+            forecast_id INT NOT NULL REFERENCES forecasts(id) ON DELETE CASCADE,
+            UNIQUE(user_id, forecast_id)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id    BIGINT PRIMARY KEY,
+            first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_seen  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS delivery_daily_stats (
+            day        DATE NOT NULL,
+            sport      VARCHAR(50) NOT NULL,
+            deliveries INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, sport)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_activity_daily (
+            day     DATE   NOT NULL,
+            user_id BIGINT NOT NULL,
+            PRIMARY KEY (day, user_id)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS activity_daily_stats (
+            day       DATE PRIMARY KEY,
+            active    INT NOT NULL DEFAULT 0,
+            new_users INT NOT NULL DEFAULT 0
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS text_forecasts (
+            id         SERIAL PRIMARY KEY,
+            sport      VARCHAR(50),
+            version    INT NOT NULL,
+            body       TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS text_forecasts_sport_version
+            ON text_forecasts (COALESCE(sport, ''), version);
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id          SERIAL PRIMARY KEY,
+            text        TEXT NOT NULL,
+            status      VARCHAR(16) NOT NULL DEFAULT 'running',
+            total       INT NOT NULL DEFAULT 0,
+            created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS broadcast_targets (
+            broadcast_id INT NOT NULL REFERENCES broadcasts(id) ON DELETE CASCADE,
+            user_id      BIGINT NOT NULL,
+            status       SMALLINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (broadcast_id, user_id)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS fsm_storage (
+            key        TEXT PRIMARY KEY,
+            state      TEXT,
+            data       JSONB NOT NULL DEFAULT '{}',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+    ]),
+    (2, "дата публикации прогнозов, выдачи по дням", [
+        "ALTER TABLE forecasts ADD COLUMN IF NOT EXISTS publish_date DATE NOT NULL DEFAULT CURRENT_DATE;",
+        "CREATE INDEX IF NOT EXISTS forecasts_publish_date ON forecasts (publish_date);",
+        """
+        CREATE TABLE IF NOT EXISTS forecasts_archive (
+            id           INT PRIMARY KEY,
+            sport        VARCHAR(50) NOT NULL,
+            file_name    VARCHAR(255) NOT NULL,
+            sha256       CHAR(64),
+            publish_date DATE NOT NULL,
+            deliveries   INT NOT NULL DEFAULT 0,
+            archived_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        # выдачи секционируются по дате публикации прогноза; ключ секционирования
+        # обязан входить в PK, внешний ключ на forecasts не нужен — старые секции
+        # удаляются целиком раньше, чем архивируются их прогнозы
+        """
+        CREATE TABLE deliveries_by_day (
+            user_id      BIGINT NOT NULL,
+            forecast_id  INT NOT NULL,
+            publish_date DATE NOT NULL,
+            delivered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, forecast_id, publish_date)
+        ) PARTITION BY RANGE (publish_date);
+        """,
+        "ALTER TABLE deliveries RENAME TO deliveries_unpartitioned;",
+        "ALTER TABLE deliveries_by_day RENAME TO deliveries;",
+        """
+        CREATE OR REPLACE FUNCTION ensure_deliveries_partition(day DATE) RETURNS VOID AS $$
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF deliveries FOR VALUES FROM (%L) TO (%L)',
+                'deliveries_' || to_char(day, 'YYYYMMDD'), day, day + 1
+            );
+        END
+        $$ LANGUAGE plpgsql;
+        """,
+        """
+        SELECT ensure_deliveries_partition(day)
+        FROM (SELECT CURRENT_DATE AS day UNION SELECT DISTINCT publish_date FROM forecasts) AS days;
+        """,
+        """
+        INSERT INTO deliveries (user_id, forecast_id, publish_date)
+        SELECT d.user_id, d.forecast_id, f.publish_date
+        FROM deliveries_unpartitioned d JOIN forecasts f ON f.id = d.forecast_id;
+        """,
+        "DROP TABLE deliveries_unpartitioned;",
+    ]),
+    (3, "аренда адресатов рассылки", [
+        "ALTER TABLE broadcast_targets ADD COLUMN IF NOT EXISTS leased_until TIMESTAMP;",
+    ]),
+    (4, "гистограмма интервалов между визитами", [
+        "ALTER TABLE activity_daily_stats ADD COLUMN IF NOT EXISTS gaps INT[] NOT NULL DEFAULT '{}';",
+        # заполняем по уже накопленным визитам; для самых старых дней прошлый визит неизвестен (31)
+        """
+        WITH v AS (
+            SELECT day, GREATEST(LEAST(COALESCE(day - LAG(day) OVER (PARTITION BY user_id ORDER BY day), 31), 31), 1) AS gap
+            FROM user_activity_daily
+        ), h AS (
+            SELECT day, gap, COUNT(*) AS n FROM v GROUP BY day, gap
+        )
+        UPDATE activity_daily_stats s
+           SET gaps = ARRAY(SELECT COALESCE(SUM(h.n), 0) FROM generate_series(1, 31) i
+                            LEFT JOIN h ON h.day = s.day AND h.gap = i GROUP BY i ORDER BY i);
+        """,
+    ]),
+    (5, "один отправитель рассылок", [
+        """
+        CREATE TABLE IF NOT EXISTS broadcast_sender (
+            id           BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),   -- всегда одна строка
+            owner        TEXT NOT NULL,
+            leased_until TIMESTAMP NOT NULL
+        );
+        """,
+    ]),
+]
+
+
+async def migrate(database: Database) -> list[int]:
+    """Применяет недостающие миграции, возвращает их номера."""
+    applied_now = []
+    async with database.transaction(timeout=None):   # ждём lock соседнего процесса и перенос данных без лимита
+        await database.execute("SELECT pg_advisory_xact_lock(:k)", values={"k": LOCK_KEY})
+        await database.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version    INT PRIMARY KEY,
+                name       TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        rows = await database.fetch_all("SELECT version FROM schema_migrations")
+        applied = {r["version"] for r in rows}
+        for version, name, statements in MIGRATIONS:
+            if version in applied:
+                continue
+            for ddl in statements:
+                await database.execute(ddl)
+            await database.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (:v, :n)",
+                values={"v": version, "n": name}
+            )
+            logger.info("Миграция %s применена: %s", version, name)
+            applied_now.append(version)
+    return applied_now
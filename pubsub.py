@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import Callable
+
+import asyncpg
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────
+#   LISTEN / NOTIFY между процессами
+# ────────────────────────────────────────────────────────────
+#   Одно отдельное соединение на процесс слушает каналы, на которые
+#   подписались кэши (subscribe до start). NOTIFY уходит через пул,
+#   внутри транзакции — при её коммите. После переподключения каждый
+#   подписчик получает пустой payload: за время разрыва уведомления
+#   могли потеряться, и кэш должен перечитать всё.
+
+
+class PubSub:
+    def __init__(self, database: Database, dsn: str, reconnect_delay: float = 5.0):
+        self.database = database
+        self.dsn      = dsn
+        self.reconnect_delay = reconnect_delay
+        self._subscribers: dict[str, list[Callable[[str], None]]] = {}
+        self._listener: asyncpg.Connection | None = None
+        self._reconnect: asyncio.Task | None = None
+        self._closing = False
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        """Регистрируется до start(); callback получает payload уведомления."""
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    async def notify(self, channel: str, payload: str = "") -> None:
+        await self.database.execute("SELECT pg_notify(:c, :p)", values={"c": channel, "p": payload})
+
+    async def start(self) -> None:
+        await self._listen()
+
+    async def stop(self) -> None:
+        self._closing = True
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+        if self._listener is not None and not self._listener.is_closed():
+            await self._listener.close()
+
+    async def _listen(self) -> None:
+        self._listener = await asyncpg.connect(self.dsn)
+        self._listener.add_termination_listener(self._on_terminated)
+        for channel in self._subscribers:
+            await self._listener.add_listener(channel, self._on_notify)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self._dispatch(channel, payload)
+
+    def _dispatch(self, channel: str, payload: str) -> None:
+        for callback in self._subscribers.get(channel, []):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("Ошибка подписчика канала %s", channel)
+
+    def _on_terminated(self, connection) -> None:
+        if not self._closing:
+            logger.warning("LISTEN-соединение потеряно, переподключаемся")
+            self._reconnect = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self) -> None:
+        while not self._closing:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._listen()
+            except Exception:
+                logger.exception("Не удалось переподключить LISTEN")
+                continue
+            for channel in self._subscribers:
+                self._dispatch(channel, "")
+            return
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import re
+from typing import Awaitable, Callable
+
+from blob_store import BlobStore
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────
+#   Ротация прогнозов и выдач
+# ────────────────────────────────────────────────────────────
+#   deliveries секционирована по дате публикации прогноза (секция
+#   на день, deliveries_YYYYMMDD). Фоновая задача раз в interval:
+#     • заранее создаёт секции на сегодня и завтра;
+#     • архивирует прогнозы старше live_days — строка переезжает
+#       в forecasts_archive вместе с числом выдач, файл удаляется,
+#       если на него не ссылается живой прогноз; идёт пачками;
+#     • отцепляет (DETACH … CONCURRENTLY) и удаляет секции выдач
+#       старше keep_days.
+#   Суточные счётчики выдач остаются в delivery_daily_stats.
+#   Пачка не больше ~500 id: их список уходит остальным процессам
+#   в payload NOTIFY (лимит 8000 байт).
+
+PARTITION = re.compile(r"^deliveries_(\d{8})$")
+
+ARCHIVE_SQL = """
+    WITH old AS (
+        DELETE FROM forecasts
+        WHERE id IN (
+            SELECT id FROM forecasts
+            WHERE publish_date <= CURRENT_DATE - CAST(:live AS INT)
+            ORDER BY id LIMIT :n
+        )
+        RETURNING id, sport, file_name, file_path, sha256, publish_date
+    ), archived AS (
+        INSERT INTO forecasts_archive (id, sport, file_name, sha256, publish_date, deliveries)
+        SELECT o.id, o.sport, o.file_name, o.sha256, o.publish_date,
+               (SELECT COUNT(*) FROM deliveries d
+                WHERE d.publish_date = o.publish_date AND d.forecast_id = o.id)
+        FROM old o
+    )
+    SELECT id, file_path FROM old
+"""
+
+
+class RetentionJob:
+    def __init__(self, database: Database, blobs: BlobStore,
+                 live_days: int = 1, keep_days: int = 30, interval: float = 3600.0, batch: int = 500,
+                 on_archived: Callable[[list[int]], Awaitable[None]] | None = None):
+        self.database    = database
+        self.blobs       = blobs
+        self.live_days   = live_days
+        self.keep_days   = max(keep_days, live_days)   # секцию можно удалить только после архивации её прогнозов
+        self.interval    = interval
+        self.batch       = batch
+        self.on_archived = on_archived
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def prepare(self) -> None:
+        """Секции выдач на сегодня и завтра — до первой выдачи новых суток."""
+        await self.database.execute(
+            "SELECT ensure_deliveries_partition(CURRENT_DATE), ensure_deliveries_partition(CURRENT_DATE + 1)"
+        )
+
+    async def run_once(self) -> tuple[int, int]:
+        await self.prepare()
+        archived = await self.archive_forecasts()
+        dropped  = await self.drop_partitions()
+        if archived or dropped:
+            logger.info("Ротация: архивировано прогнозов %s, удалено секций выдач %s", archived, dropped)
+        return archived, dropped
+
+    async def archive_forecasts(self) -> int:
+        total = 0
+        while True:
+            rows = await self.database.fetch_all(ARCHIVE_SQL, values={"live": self.live_days, "n": self.batch})
+            if not rows:
+                return total
+            total += len(rows)
+            if self.on_archived is not None:
+                await self.on_archived([r["id"] for r in rows])
+            await self._remove_files([r["file_path"] for r in rows])
+
+    async def drop_partitions(self) -> int:
+        cutoff = await self.database.fetch_val("SELECT CURRENT_DATE - CAST(:d AS INT)", values={"d": self.keep_days})
+        rows = await self.database.fetch_all(
+            "SELECT c.relname, i.inhdetachpending AS pending "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST('deliveries' AS REGCLASS)"
+        )
+        expired = sorted((r["relname"], r["pending"]) for r in rows
+                         if (m := PARTITION.match(r["relname"])) and m.group(1) < f"{cutoff:%Y%m%d}")
+        for name, pending in expired:
+            try:
+                # CONCURRENTLY не блокирует выдачи в остальных секциях (только вне транзакции);
+                # прерванное отцепление дозавершаем через FINALIZE
+                mode = "FINALIZE" if pending else "CONCURRENTLY"
+                await self.database.execute(f"ALTER TABLE deliveries DETACH PARTITION {name} {mode}")
+                await self.database.execute(f"DROP TABLE {name}")
+            except Exception:
+                logger.exception("Не удалось удалить секцию %s", name)
+        return len(expired)
+
+    async def _remove_files(self, paths: list[str]) -> None:
+        # картинки content-addressed: тот же файл мог остаться у живого прогноза
+        rows = await self.database.fetch_all(
+            "SELECT DISTINCT file_path FROM forecasts WHERE file_path = ANY(CAST(:p AS TEXT[]))",
+            values={"p": paths}
+        )
+        in_use = {r["file_path"] for r in rows}
+        await self.blobs.remove([p for p in set(paths) if p not in in_use])
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ротация прогнозов не удалась")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,59 @@
+import asyncio
+
+from activity import ActivityBuffer
+
+
+class FakeDatabase:
+    def __init__(self, fail: bool = False):
+        self.fail    = fail
+        self.batches: list[list[int]] = []
+
+    async def execute(self, query: str, values: dict | None = None):
+        if self.fail:
+            raise ConnectionError("db down")
+        self.batches.append(values["ids"])
+
+
+def test_flush_writes_batch_and_empties_buffer():
+    buffer = ActivityBuffer(FakeDatabase())
+    buffer.touch(1)
+    buffer.touch(2)
+    buffer.touch(1)
+    assert asyncio.run(buffer.flush()) == 2
+    assert buffer.database.batches == [[1, 2]]
+    assert buffer.snapshot() == {}
+    assert asyncio.run(buffer.flush()) == 0
+
+
+def test_failed_flush_requeues_visits():
+    buffer = ActivityBuffer(FakeDatabase(fail=True))
+    buffer.touch(1)
+    buffer.touch(2)
+    try:
+        asyncio.run(buffer.flush())
+    except ConnectionError:
+        pass
+    assert set(buffer.snapshot()) == {1, 2}
+    buffer.database.fail = False
+    assert asyncio.run(buffer.flush()) == 2
+
+
+def test_stop_logs_flush_error_instead_of_raising(caplog):
+    buffer = ActivityBuffer(FakeDatabase(fail=True))
+    buffer.touch(1)
+    asyncio.run(buffer.stop())
+    assert "Не удалось сбросить буфер активности" in caplog.text
+    assert set(buffer.snapshot()) == {1}
+
+
+def test_overflow_flush_error_is_logged(caplog):
+    async def scenario():
+        buffer = ActivityBuffer(FakeDatabase(fail=True), max_size=2)
+        buffer.touch(1)
+        buffer.touch(2)                           # переполнение — сброс в фоне
+        await buffer._overflow_task
+        return buffer
+
+    buffer = asyncio.run(scenario())
+    assert "Не удалось сбросить буфер активности" in caplog.text
+    assert set(buffer.snapshot()) == {1, 2}
@@ -0,0 +1,92 @@
+import asyncio
+
+import broadcast
+from broadcast import BroadcastEngine, TokenBucket
+
+
+class Clock:
+    """Подменяет time.monotonic и asyncio.sleep: sleep просто сдвигает время."""
+
+    def __init__(self):
+        self.now   = 1000.0
+        self.slept = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def make_bucket(monkeypatch, rate: float, capacity: int | None = None) -> tuple[TokenBucket, Clock]:
+    clock = Clock()
+    monkeypatch.setattr(broadcast.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(broadcast.asyncio, "sleep", clock.sleep)
+    return TokenBucket(rate, capacity), clock
+
+
+async def acquire(bucket: TokenBucket, n: int) -> None:
+    for _ in range(n):
+        await bucket.acquire()
+
+
+def test_burst_up_to_capacity_then_rate(monkeypatch):
+    bucket, clock = make_bucket(monkeypatch, rate=8.0, capacity=4)
+    asyncio.run(acquire(bucket, 4))
+    assert clock.slept == []
+    asyncio.run(acquire(bucket, 8))
+    assert clock.now == 1001.0                     # ещё 8 токенов по 8 в секунду
+
+
+def test_capacity_defaults_to_rate(monkeypatch):
+    bucket, _ = make_bucket(monkeypatch, rate=25.0)
+    assert bucket.capacity == 25
+    bucket, _ = make_bucket(monkeypatch, rate=0.5)
+    assert bucket.capacity == 1
+
+
+def test_pause_blocks_until_flood_wait_ends(monkeypatch):
+    bucket, clock = make_bucket(monkeypatch, rate=8.0, capacity=4)
+    bucket.pause(3.0)
+    asyncio.run(acquire(bucket, 1))
+    assert clock.slept[0] == 3.0
+    assert clock.now >= 1003.0
+
+
+class FakeDatabase:
+    def __init__(self, owner: str | None):
+        self.owner = owner
+        self.executed: list[tuple[str, dict]] = []
+
+    async def fetch_val(self, query: str, values: dict | None = None):
+        return self.owner
+
+    async def execute(self, query: str, values: dict | None = None):
+        self.executed.append((query, values))
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent: list[int] = []
+
+    async def send_message(self, chat_id: int, text: str):
+        self.sent.append(chat_id)
+
+
+def test_only_lease_holder_sends():
+    engine = BroadcastEngine(FakeBot(), FakeDatabase(owner=None), rate=1000.0)
+    assert not asyncio.run(engine._hold_sender())
+    engine.database.owner = engine._owner
+    assert asyncio.run(engine._hold_sender())
+    assert engine._sender_until > 0
+
+
+def test_expired_lease_stops_page_and_releases_rest():
+    engine = BroadcastEngine(FakeBot(), FakeDatabase(owner=None), rate=1000.0)
+    engine._sender_until = 0.0
+    results = asyncio.run(engine._send_page("hi", [1, 2, 3]))
+    assert results == {} and engine.bot.sent == []
+    asyncio.run(engine._save_results(7, results, [1, 2, 3]))
+    (query, values), = engine.database.executed
+    assert "leased_until = NULL" in query and values == {"b": 7, "ids": [1, 2, 3]}
@@ -0,0 +1,81 @@
+import asyncio
+import io
+import zipfile
+from types import SimpleNamespace
+
+from bulk_upload import AlbumCollector, read_zip_images
+
+CATEGORIES = ["football", "hockey"]
+
+
+def make_zip(files: dict[str, bytes]) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_images_grouped_by_sport_folder():
+    data = make_zip({
+        "football/1.jpg":         b"a",
+        "Hockey/2.PNG":           b"b",
+        "upload/football/3.webp": b"c",
+    })
+    images, skipped = read_zip_images(data, CATEGORIES)
+    assert images == [("football", b"a"), ("hockey", b"b"), ("football", b"c")]
+    assert skipped == 0
+
+
+def test_unknown_folders_and_files_are_skipped():
+    data = make_zip({
+        "1.jpg":                b"root",
+        "tennis/2.jpg":         b"unknown sport",
+        "football/notes.txt":   b"not an image",
+        "football/.hidden.jpg": b"hidden",
+        "football/ok.jpeg":     b"ok",
+    })
+    images, skipped = read_zip_images(data, CATEGORIES)
+    assert images == [("football", b"ok")]
+    assert skipped == 4
+
+
+def test_directories_are_not_counted():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        archive.writestr(zipfile.ZipInfo("football/"), b"")
+        archive.writestr("football/1.png", b"x")
+    assert read_zip_images(buf.getvalue(), CATEGORIES) == ([("football", b"x")], 0)
+
+
+def test_album_delivered_once_after_parts_stop():
+    albums = []
+
+    async def on_complete(album):
+        albums.append([m.message_id for m in album])
+
+    async def scenario():
+        collector = AlbumCollector(latency=0.05)
+        for message_id in (3, 1, 2):
+            collector.add(SimpleNamespace(media_group_id="g", message_id=message_id), on_complete)
+            await asyncio.sleep(0.02)             # меньше latency: таймер перезапускается
+        assert albums == []
+        collector.add(SimpleNamespace(media_group_id="h", message_id=9), on_complete)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert albums == [[1, 2, 3], [9]]
+
+
+def test_album_handler_error_is_logged_not_raised(caplog):
+    async def on_complete(album):
+        raise RuntimeError("boom")
+
+    async def scenario():
+        collector = AlbumCollector(latency=0.01)
+        collector.add(SimpleNamespace(media_group_id="g", message_id=1), on_complete)
+        await asyncio.sleep(0.05)
+        assert collector._albums == {} and collector._timers == {}
+
+    asyncio.run(scenario())
+    assert "Не удалось обработать альбом g" in caplog.text
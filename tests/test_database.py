@@ -0,0 +1,23 @@
+from database import compile_query
+
+
+def test_named_params_become_positional():
+    sql, names = compile_query("SELECT * FROM t WHERE a = :a AND b = :b")
+    assert sql == "SELECT * FROM t WHERE a = $1 AND b = $2"
+    assert names == ("a", "b")
+
+
+def test_repeated_param_reuses_position():
+    sql, names = compile_query("SELECT :x, :y, :x")
+    assert sql == "SELECT $1, $2, $1"
+    assert names == ("x", "y")
+
+
+def test_casts_and_time_literals_are_not_params():
+    sql, names = compile_query("SELECT CAST(:ids AS BIGINT[]), now()::date, '12:30'::time")
+    assert sql == "SELECT CAST($1 AS BIGINT[]), now()::date, '12:30'::time"
+    assert names == ("ids",)
+
+
+def test_query_without_params():
+    assert compile_query("SELECT 1") == ("SELECT 1", ())
@@ -0,0 +1,104 @@
+import asyncio
+
+from forecast_index import ForecastIndex, iter_bits
+
+
+class FakeDatabase:
+    def __init__(self, forecasts: list[tuple[int, str]], deliveries: dict[int, list[int]] | None = None):
+        self.forecasts  = forecasts
+        self.deliveries = deliveries or {}
+
+    async def fetch_all(self, query: str, values: dict | None = None):
+        if "FROM forecasts" in query and "deliveries" not in query:
+            return [{"id": fid, "sport": sport} for fid, sport in self.forecasts]
+        return [{"forecast_id": fid} for fid in self.deliveries.get(values["uid"], [])]
+
+
+def make_index(forecasts, deliveries=None) -> ForecastIndex:
+    index = ForecastIndex(FakeDatabase(forecasts, deliveries), ["football", "hockey"])
+    asyncio.run(index.warm())
+    return index
+
+
+def test_iter_bits():
+    assert list(iter_bits(0)) == []
+    assert list(iter_bits(0b101001)) == [0, 3, 5]
+    assert list(iter_bits(0b11, base=100)) == [100, 101]
+
+
+def test_catalog_is_relative_to_lowest_id():
+    index = make_index([(1000, "football"), (1002, "football"), (1001, "hockey")])
+    assert index._base == 1000
+    assert index._catalog == {"football": 0b101, "hockey": 0b10}
+
+
+def test_available_excludes_delivered():
+    index = make_index([(10, "football"), (11, "football"), (12, "hockey")], {7: [11]})
+    assert asyncio.run(index.available(7)) == {"football": [10], "hockey": [12]}
+    index.mark_delivered(7, 12)
+    assert asyncio.run(index.counts(7)) == {"football": 1, "hockey": 0}
+    index.unmark_delivered(7, 11)
+    assert asyncio.run(index.available(7)) == {"football": [10, 11], "hockey": []}
+
+
+def test_add_lower_id_rebases_down():
+    index = make_index([(20, "football")], {7: [20]})
+    asyncio.run(index.available(7))
+    index.add_forecast(18, "hockey")
+    assert index._base == 18
+    assert asyncio.run(index.available(7)) == {"football": [], "hockey": [18]}
+    assert list(iter_bits(index._delivered[7], index._base)) == [20]
+
+
+def test_add_to_empty_catalog_starts_at_new_id():
+    index = make_index([])
+    index.add_forecast(500, "football")
+    assert index._base == 500
+    assert index._catalog["football"] == 1
+
+
+def test_remove_rebases_up():
+    index = make_index([(5, "football"), (6, "hockey"), (9, "football")], {7: [6, 9]})
+    asyncio.run(index.available(7))
+    index.remove_forecasts([5, 6])
+    assert index._base == 9
+    assert index._catalog == {"football": 1, "hockey": 0}
+    assert list(iter_bits(index._delivered[7], index._base)) == [9]
+
+
+def test_invalidate_reloads_catalog():
+    index = make_index([(1, "football")])
+    index.database.forecasts = [(1, "football"), (2, "hockey")]
+    assert asyncio.run(index.counts(0)) == {"football": 1, "hockey": 0}
+    index.invalidate()
+    assert asyncio.run(index.counts(0)) == {"football": 1, "hockey": 1}
+
+
+def test_delivered_mask_expires(monkeypatch):
+    import forecast_index
+    now = [100.0]
+    monkeypatch.setattr(forecast_index.time, "monotonic", lambda: now[0])
+    index = make_index([(1, "football"), (2, "football")])
+    index.ttl = 60.0
+    assert asyncio.run(index.counts(7))["football"] == 2
+    index.database.deliveries[7] = [1]            # выдача в другом процессе
+    assert asyncio.run(index.counts(7))["football"] == 2
+    now[0] += 61
+    assert asyncio.run(index.counts(7))["football"] == 1
+
+
+def test_forget_delivered_reloads_mask():
+    index = make_index([(1, "football")])
+    assert asyncio.run(index.counts(7))["football"] == 1
+    index.database.deliveries[7] = [1]
+    index.forget_delivered(7)
+    assert asyncio.run(index.counts(7))["football"] == 0
+
+
+def test_clear_rereads_catalog():
+    index = make_index([(1, "football")], {7: [1]})
+    asyncio.run(index.counts(7))
+    index.database.forecasts  = [(3, "hockey")]   # загружен после TRUNCATE
+    index.database.deliveries = {}
+    index.clear()
+    assert asyncio.run(index.available(7)) == {"football": [], "hockey": [3]}
@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+from aiogram.fsm.storage.base import StorageKey
+
+from fsm_storage import PostgresStorage
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.rows:  dict[str, tuple[str | None, str]] = {}
+        self.reads  = 0
+        self.writes = 0
+        self.fail   = False
+        self.gate: asyncio.Event | None = None    # задерживает запись, пока его не откроют
+
+    async def execute(self, query: str, values: dict | None = None):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            raise ConnectionError("db down")
+        self.writes += 1
+        if query.lstrip().startswith("DELETE"):
+            for k in values["keys"]:
+                self.rows.pop(k, None)
+        else:
+            for k, s, d in zip(values["keys"], values["states"], values["datas"]):
+                self.rows[k] = (s, d)
+
+    async def fetch_one(self, query: str, values: dict | None = None):
+        self.reads += 1
+        row = self.rows.get(values["k"])
+        return {"state": row[0], "data": row[1]} if row else None
+
+
+def test_writes_are_buffered_and_read_back_from_pending():
+    async def scenario():
+        db = FakeDatabase()
+        storage = PostgresStorage(db, cache_ttl=0)
+        await storage.set_data(KEY, {"a": 1})
+        await storage.update_data(KEY, {"b": 2})
+        assert db.writes == 0
+        assert await storage.get_data(KEY) == {"a": 1, "b": 2}
+        reads_before_flush = db.reads
+        await storage.flush()
+        assert db.writes == 1
+        assert await storage.get_data(KEY) == {"a": 1, "b": 2}   # без кэша — уже из БД
+        return reads_before_flush, db.reads
+
+    before, after = asyncio.run(scenario())
+    assert after == before + 1
+
+
+def test_inflight_write_is_visible_while_flushing():
+    async def scenario():
+        db = FakeDatabase()
+        storage = PostgresStorage(db, cache_ttl=0)
+        await storage.set_state(KEY, "waiting")
+        db.gate = asyncio.Event()
+        flushing = asyncio.create_task(storage.flush())
+        await asyncio.sleep(0)
+        assert storage._inflight and not storage._pending
+        reads = db.reads
+        assert await storage.get_state(KEY) == "waiting"
+        assert db.reads == reads                  # не из БД: там ещё старое
+        db.gate.set()
+        await flushing
+
+    asyncio.run(scenario())
+
+
+def test_failed_flush_keeps_newer_writes():
+    async def scenario():
+        db = FakeDatabase()
+        storage = PostgresStorage(db)
+        await storage.set_data(KEY, {"v": 1})
+        db.fail, db.gate = True, asyncio.Event()
+        flushing = asyncio.create_task(storage.flush())
+        await asyncio.sleep(0)
+        await storage.set_data(KEY, {"v": 2})     # новее той, что сейчас пишется
+        db.gate.set()
+        try:
+            await flushing
+        except ConnectionError:
+            pass
+        db.fail, db.gate = False, None
+        await storage.flush()
+        return db.rows
+
+    rows = asyncio.run(scenario())
+    (_, data), = rows.values()
+    assert json.loads(data) == {"v": 2}
+
+
+def test_cleared_key_is_deleted():
+    async def scenario():
+        db = FakeDatabase()
+        storage = PostgresStorage(db)
+        await storage.set_data(KEY, {"v": 1})
+        await storage.flush()
+        await storage.set_data(KEY, {})
+        await storage.flush()
+        return db.rows
+
+    assert asyncio.run(scenario()) == {}
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from aiogram.types import Update
+
+from ingest import QueueFull, UpdateQueue
+from metrics import Registry
+
+
+def message(update_id: int, chat_id: int) -> Update:
+    return Update(update_id=update_id, message={
+        "message_id": update_id, "date": 0, "text": "x",
+        "chat": {"id": chat_id, "type": "private"},
+    })
+
+
+class FakeDispatcher:
+    def __init__(self, slow_chat: int | None = None):
+        self.seen: list[tuple[int, int]] = []
+        self.slow_chat = slow_chat
+        self.release   = asyncio.Event()
+
+    async def feed_update(self, bot, update: Update):
+        chat_id = update.message.chat.id
+        if chat_id == self.slow_chat:
+            await self.release.wait()
+        self.seen.append((chat_id, update.update_id))
+
+
+def test_order_kept_within_chat():
+    async def scenario():
+        dp = FakeDispatcher()
+        queue = UpdateQueue(dp, bot=None, workers=4, maxsize=100)
+        await queue.start()
+        for i in range(1, 31):
+            queue.put(message(i, chat_id=i % 3))
+        await queue.stop()
+        return dp.seen
+
+    seen = asyncio.run(scenario())
+    assert len(seen) == 30
+    for chat in range(3):
+        ids = [uid for c, uid in seen if c == chat]
+        assert ids == sorted(ids)
+
+
+def test_slow_chat_does_not_block_others():
+    async def scenario():
+        dp = FakeDispatcher(slow_chat=1)
+        queue = UpdateQueue(dp, bot=None, workers=2, maxsize=100)
+        await queue.start()
+        for i in range(1, 6):
+            queue.put(message(i, chat_id=1))
+        for i in range(6, 11):
+            queue.put(message(i, chat_id=3))      # тот же остаток по модулю 2, что и у чата 1
+        await asyncio.sleep(0.05)
+        done_before_release = list(dp.seen)
+        dp.release.set()
+        await queue.stop()
+        return done_before_release, dp.seen
+
+    before, seen = asyncio.run(scenario())
+    assert before == [(3, i) for i in range(6, 11)]
+    assert [uid for c, uid in seen if c == 1] == [1, 2, 3, 4, 5]
+
+
+def test_queue_full_counts_dropped():
+    registry = Registry()
+    queue = UpdateQueue(FakeDispatcher(), bot=None, workers=2, maxsize=3, registry=registry)
+    for i in range(3):
+        queue.put(message(i, chat_id=i))
+    with pytest.raises(QueueFull):
+        queue.put(message(99, chat_id=5))
+    assert queue.depth == 3 and queue.dropped == 1
+    assert "bot_update_queue_dropped_total 1.0" in registry.render()
@@ -0,0 +1,34 @@
+from metrics import Registry, sql_label
+
+
+def test_render_histogram_counter_and_gauge():
+    registry = Registry()
+    registry.describe("bot_sql_seconds", "Время SQL-запроса")
+    registry.observe("bot_sql_seconds", {"sql": "SELECT 1"}, 0.007)
+    registry.observe("bot_sql_seconds", {"sql": "SELECT 1"}, 20.0)
+    registry.inc("bot_update_queue_dropped_total", {})
+    registry.inc("bot_throttled_total", {"kind": "buy", "scope": "user"}, 2)
+    registry.gauge("bot_update_queue_depth", lambda: 3, "Апдейтов в очереди")
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ["# HELP bot_sql_seconds Время SQL-запроса", "# TYPE bot_sql_seconds histogram"]
+    assert 'bot_sql_seconds_bucket{sql="SELECT 1",le="0.005"} 0' in lines
+    assert 'bot_sql_seconds_bucket{sql="SELECT 1",le="0.01"} 1' in lines
+    assert 'bot_sql_seconds_bucket{sql="SELECT 1",le="+Inf"} 2' in lines
+    assert 'bot_sql_seconds_count{sql="SELECT 1"} 2' in lines
+    assert "# TYPE bot_update_queue_dropped_total counter" in lines
+    assert "bot_update_queue_dropped_total 1.0" in lines
+    assert 'bot_throttled_total{kind="buy",scope="user"} 2.0' in lines
+    assert "# TYPE bot_update_queue_depth gauge" in lines
+    assert "bot_update_queue_depth 3" in lines
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.inc("bot_api_errors_total", {"api": 'a"b\\c\nd'})
+    assert r'bot_api_errors_total{api="a\"b\\c d"} 1.0' in registry.render()
+
+
+def test_sql_label_collapses_whitespace_and_truncates():
+    assert sql_label("SELECT *\n   FROM   t") == "SELECT * FROM t"
+    assert sql_label("x" * 200, limit=10) == "x" * 9 + "…"
@@ -0,0 +1,20 @@
+from pubsub import PubSub
+
+
+def test_dispatch_to_every_subscriber_of_channel():
+    pubsub = PubSub(database=None, dsn="")
+    got = []
+    pubsub.subscribe("forecasts", lambda p: got.append(("a", p)))
+    pubsub.subscribe("forecasts", lambda p: got.append(("b", p)))
+    pubsub.subscribe("texts", lambda p: got.append(("texts", p)))
+    pubsub._dispatch("forecasts", "clear")
+    assert got == [("a", "clear"), ("b", "clear")]
+
+
+def test_failing_subscriber_does_not_block_others():
+    pubsub = PubSub(database=None, dsn="")
+    got = []
+    pubsub.subscribe("forecasts", lambda p: 1 / 0)
+    pubsub.subscribe("forecasts", got.append)
+    pubsub._dispatch("forecasts", "")
+    assert got == [""]
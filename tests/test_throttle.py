@@ -0,0 +1,34 @@
+from throttle import SlidingWindow
+
+
+def test_limit_within_window():
+    w = SlidingWindow(10.0)
+    assert [w.hit("u", 3, now=100.0 + i) for i in range(4)] == [True, True, True, False]
+    assert w.hit("other", 3, now=103.0)
+
+
+def test_previous_window_is_weighted():
+    w = SlidingWindow(10.0)
+    for _ in range(4):
+        assert w.hit("u", 4, now=100.0)
+    # начало следующего окна: предыдущее весит 0.95 — 3.8 + 0 < 4, а 3.8 + 1 уже нет
+    assert w.hit("u", 4, now=110.5)
+    assert not w.hit("u", 4, now=110.5)
+    # к концу окна вес предыдущего 0.2: 0.8 + 1 < 4
+    assert w.hit("u", 4, now=118.0)
+
+
+def test_slot_resets_after_two_windows():
+    w = SlidingWindow(10.0)
+    for _ in range(2):
+        w.hit("u", 2, now=100.0)
+    assert not w.hit("u", 2, now=101.0)
+    assert w.hit("u", 2, now=121.0)
+
+
+def test_sweep_drops_expired_slots():
+    w = SlidingWindow(10.0)
+    w.hit("old", 5, now=100.0)
+    w.hit("new", 5, now=125.0)
+    w.sweep(now=125.0)
+    assert len(w) == 1
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+
+from database import Database
+from pubsub import PubSub
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────
+#   Текстовые прогнозы
+# ────────────────────────────────────────────────────────────
+#   Тексты хранятся в Postgres с версиями (общий — sport IS NULL,
+#   либо отдельно по виду спорта); каждый процесс отдаёт их из
+#   памяти без запросов к БД. После изменения процесс шлёт NOTIFY,
+#   и все процессы (включая его самого) перечитывают актуальные версии
+#   (в том числе после переподключения LISTEN — см. pubsub.py).
+
+CHANNEL = "text_forecasts"
+
+
+class TextForecastStore:
+    def __init__(self, database: Database, pubsub: PubSub):
+        self.database = database
+        self.pubsub   = pubsub
+        self._texts: dict[str | None, str] = {}
+        self._reload: asyncio.Task | None = None
+        self._stale   = False
+        pubsub.subscribe(CHANNEL, self._on_notify)
+
+    # ── чтение: только из памяти ──
+
+    def render(self, categories: list[str], emoji: dict[str, str]) -> str:
+        parts = [self._texts[None]] if self._texts.get(None) else []
+        for sport in categories:
+            if self._texts.get(sport):
+                parts.append(f"{emoji.get(sport, '')} <b>{sport.capitalize()}</b>\n{self._texts[sport]}")
+        return "\n\n".join(parts)
+
+    # ── запись ──
+
+    async def publish(self, body: str, sport: str | None = None) -> int:
+        async with self.database.transaction():
+            version = await self.database.fetch_val("""
+                INSERT INTO text_forecasts (sport, version, body)
+                SELECT CAST(:s AS VARCHAR(50)), COALESCE(MAX(version), 0) + 1, :b
+                FROM text_forecasts WHERE sport IS NOT DISTINCT FROM CAST(:s AS VARCHAR(50))
+                RETURNING version
+            """, values={"s": sport, "b": body})
+            await self._notify()
+        self._texts[sport] = body
+        return version
+
+    async def clear(self) -> None:
+        async with self.database.transaction():
+            await self.database.execute("DELETE FROM text_forecasts")
+            await self._notify()
+        self._texts = {}
+
+    async def load(self) -> None:
+        rows = await self.database.fetch_all("""
+            SELECT DISTINCT ON (COALESCE(sport, '')) sport, body
+            FROM text_forecasts
+            ORDER BY COALESCE(sport, ''), version DESC
+        """)
+        self._texts = {r["sport"]: r["body"] for r in rows}
+
+    # ── NOTIFY ──
+
+    async def start(self) -> None:
+        await self.load()
+
+    async def stop(self) -> None:
+        if self._reload is not None:
+            self._reload.cancel()
+
+    async def _notify(self) -> None:
+        await self.pubsub.notify(CHANNEL)
+
+    def _on_notify(self, payload: str) -> None:
+        self._stale = True                        # идущее сейчас чтение могло не увидеть изменение
+        if self._reload is None or self._reload.done():
+            self._reload = asyncio.create_task(self._safe_load())
+
+    async def _safe_load(self) -> None:
+        while self._stale:
+            self._stale = False
+            try:
+                await self.load()
+            except Exception:
+                logger.exception("Не удалось перечитать текстовые прогнозы")
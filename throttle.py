@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import Update, User
+
+from metrics import Registry
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────
+#   Флуд-контроль
+# ────────────────────────────────────────────────────────────
+#   Проверка идёт прямо в webhook, до очереди и dp.feed_update: апдейт
+#   сверх лимита не доходит ни до middleware aiogram (FSM читает
+#   состояние из БД), ни до хэндлеров. Лимиты задаются
+#   по типу апдейта — на пользователя и на всех вместе — за скользящее
+#   окно. Окно считается приближённо по двум соседним фиксированным
+#   окнам (предыдущее с весом), на ключ хранится три числа; ключи,
+#   не обновлявшиеся два окна, вычищаются раз в окно.
+#   Пользователь получает одно предупреждение за окно, остальное молча.
+
+NOTICE = "⏳ Слишком много запросов, попробуйте чуть позже."
+
+
+@dataclass(frozen=True)
+class Limit:
+    per_user: int                                 # апдейтов от одного пользователя за окно
+    total: int = 0                                # от всех пользователей вместе, 0 — без лимита
+
+
+def update_kind(update: Update) -> str:
+    if update.callback_query is not None:
+        data = update.callback_query.data or ""
+        return "buy" if data.startswith("buy_") else "callback"
+    if update.message is not None:
+        return "message"
+    return "other"
+
+
+class SlidingWindow:
+    def __init__(self, window: float):
+        self.window = window
+        self._slots: dict[Any, list] = {}         # ключ → [начало окна, счёт предыдущего, счёт текущего]
+        self._swept = 0.0
+
+    def hit(self, key: Any, limit: int, now: float) -> bool:
+        """Засчитывает попытку; False — лимит за окно уже исчерпан."""
+        start = now - now % self.window
+        slot  = self._slots.get(key)
+        if slot is None or start - slot[0] >= 2 * self.window:
+            slot = self._slots[key] = [start, 0, 0]
+        elif start > slot[0]:
+            slot[:] = [start, slot[2], 0]
+        weight = 1 - (now - start) / self.window
+        if slot[1] * weight + slot[2] >= limit:
+            return False
+        slot[2] += 1
+        return True
+
+    def sweep(self, now: float) -> None:
+        if now - self._swept < self.window:
+            return
+        self._swept = now
+        expired = now - now % self.window - self.window
+        for key in [k for k, slot in self._slots.items() if slot[0] < expired]:
+            del self._slots[key]
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+class Throttle:
+    def __init__(self, bot: Bot, limits: dict[str, Limit], window: float = 10.0,
+                 exempt: set[int] | None = None, registry: Registry | None = None):
+        self.bot      = bot
+        self.limits   = limits
+        self.window   = window
+        self.exempt   = exempt or set()
+        self.registry = registry
+        self.counters = SlidingWindow(window)
+        self.dropped: Counter[str] = Counter()
+        self._noticed: dict[int, float] = {}      # пользователь → до какого момента не предупреждаем
+        self._notices: set[asyncio.Task] = set()
+
+    def allow(self, update: Update) -> bool:
+        """False — апдейт сверх лимита, обрабатывать его не нужно."""
+        user  = _from_user(update)
+        kind  = update_kind(update)
+        limit = self.limits.get(kind)
+        if user is None or limit is None or user.id in self.exempt:
+            return True
+
+        now = time.monotonic()
+        self.counters.sweep(now)
+        if not self.counters.hit((kind, user.id), limit.per_user, now):
+            self._drop(update, user.id, kind, "user", now)
+            return False
+        if limit.total and not self.counters.hit(kind, limit.total, now):
+            self._drop(update, user.id, kind, "global", now)
+            return False
+        return True
+
+    def summary(self) -> str:
+        return ", ".join(f"{kind} {n}" for kind, n in self.dropped.most_common()) or "0"
+
+    def _drop(self, update: Update, user_id: int, kind: str, scope: str, now: float) -> None:
+        self.dropped[kind] += 1
+        if self.registry is not None:
+            self.registry.inc("bot_throttled_total", {"kind": kind, "scope": scope})
+        if self._noticed.get(user_id, 0.0) > now:
+            return
+        if len(self._noticed) > len(self.counters):
+            self._noticed = {uid: t for uid, t in self._noticed.items() if t > now}
+        self._noticed[user_id] = now + self.window
+        logger.info("Флуд-контроль: пользователь %s, %s (%s)", user_id, kind, scope)
+        if update.callback_query is not None:
+            self._send(self.bot.answer_callback_query(update.callback_query.id, NOTICE))
+        elif update.message is not None:
+            self._send(self.bot.send_message(update.message.chat.id, NOTICE))
+
+    def _send(self, call: Awaitable) -> None:
+        task = asyncio.create_task(self._answer(call))
+        self._notices.add(task)
+        task.add_done_callback(self._notices.discard)
+
+    @staticmethod
+    async def _answer(call: Awaitable) -> None:
+        try:
+            await call
+        except TelegramAPIError:
+            pass
+
+
+def _from_user(update: Update) -> User | None:
+    event = update.callback_query or update.message
+    return event.from_user if event is not None else None